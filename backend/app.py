@@ -3,39 +3,114 @@ Stock Portfolio Management API
 A Flask-based backend for managing stock portfolios with SQLite database
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from scraper import scrape_screener_ratios, scrape_quarterly_results
+from kotak_parser import parse_kotak_page, parse_kotak_price_text
 import requests
-from bs4 import BeautifulSoup
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
+import orjson
 import os
+import queue
 import re
 import time
 import traceback
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlsplit
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from threading import Lock, Thread
 from datetime import datetime
 from auth import register_user, login_user, jwt_required, get_current_user
 
 # Import database functions
 from database import (
     init_database, get_or_create_company, create_holding, add_purchase,
-    get_all_holdings, get_holding_by_id, update_holding_prices, 
+    get_all_holdings, get_holding_by_id, bulk_update_holding_prices,
     sell_holding_shares, save_ratios_cache, get_ratios_cache,
     save_quarterly_cache, get_quarterly_cache, get_companies_for_suggestions,
     find_company_by_ticker, update_holding_avg_price_and_quantity,
-    find_existing_holding_by_ticker
+    find_existing_holding_by_ticker, update_company_kotak_url,
+    record_kotak_url_failure, clear_kotak_url_failure, kotak_url_failed_recently
 )
 
 # ============================================================================
 # APPLICATION CONFIGURATION
 # ============================================================================
 
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by the orjson C encoder"""
+    
+    OPTIONS = orjson.OPT_NON_STR_KEYS
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.OPTIONS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.OPTIONS), mimetype='application/json')
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
-# Initialize database on startup
-init_database()
-print("🗄️ SQLite database initialized")
+# Shared worker pool for fanning out blocking scrape requests
+SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', '32'))
+price_executor = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS)
+
+# Pooled HTTP session so scrapes reuse keep-alive connections
+http_session = requests.Session()
+http_session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+http_adapter = HTTPAdapter(
+    pool_connections=32, pool_maxsize=max(SCRAPE_WORKERS, 64),
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+# Mounted for every HTTPS host so redirects off the main domains (and
+# the default adapter's 10-connection pool) don't force fresh TLS handshakes
+http_session.mount('https://', http_adapter)
+
+# Precompiled patterns for Kotak URL slugs
+PAREN_GROUP_RE = re.compile(r'\(([^)]*)\)')
+PAREN_RE = re.compile(r'\([^)]*\)')
+SPACE_RE = re.compile(r'\s+')
+SLUG_SEPARATOR_RE = re.compile(r'[ -]+')
+NON_WORD_RE = re.compile(r'[^\w\s-]')
+
+# Company name heading on a Screener company page
+SCREENER_NAME_SELECTOR = 'div.flex-row.flex-wrap.flex-align-center.flex-grow h1.margin-0.show-from-tablet-landscape'
+
+# Byte table that deletes everything except ASCII digits and '.'
+PRICE_DELETE_BYTES = bytes(b for b in range(256) if b not in b'0123456789.')
+
+# Conditional-GET cache for scraped pages, keyed by URL
+PAGE_CACHE_TTL_SECONDS = 180  # Reuse window for pages that ship no validators
+page_cache = {}
+page_cache_lock = Lock()
+
+# Short-lived memo for scrape results, so repeated loads skip the network entirely
+SCRAPE_MEMO_TTL_SECONDS = 30
+SCRAPE_MEMO_MAXSIZE = 512
+
+# In-flight scrapes, keyed so concurrent callers can share one request
+inflight_scrapes = {}
+inflight_lock = Lock()
+
+# Write-behind queue for market price updates
+PRICE_WRITE_BATCH_SIZE = 100
+PRICE_WRITE_INTERVAL_SECONDS = 0.2
+price_write_queue = queue.Queue()
+
+# Companies with no discoverable Kotak page are not re-probed for this long
+KOTAK_URL_RETRY_HOURS = 24
 
 # ============================================================================
 # AUTHENTICATION ROUTES
@@ -152,9 +227,49 @@ def parse_price(value):
     if isinstance(value, (int, float)):
         return float(value)
     
-    cleaned = re.sub(r'[^\d.]', '', str(value))
+    # Plain "123.45" strings need no cleanup
+    if isinstance(value, str) and value.isascii() and value.replace('.', '', 1).isdigit():
+        return float(value)
+    
+    cleaned = str(value).encode('ascii', 'ignore').translate(None, PRICE_DELETE_BYTES)
     return float(cleaned) if cleaned else 0.0
 
+def ttl_memo(ttl_seconds, maxsize, should_cache=bool):
+    """Thread-safe LRU memo whose entries expire after ttl_seconds"""
+    def decorator(fn):
+        cache = OrderedDict()
+        lock = Lock()
+        
+        @wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                entry = cache.get(args)
+                if entry and entry[0] > now:
+                    cache.move_to_end(args)
+                    return entry[1]
+            
+            result = fn(*args)
+            if should_cache(result):
+                with lock:
+                    cache[args] = (now + ttl_seconds, result)
+                    cache.move_to_end(args)
+                    if len(cache) > maxsize:
+                        cache.popitem(last=False)
+            return result
+        
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+def raw_json_response(raw_field, raw_json, **fields):
+    """Build a JSON response that embeds an already-serialized JSON value verbatim"""
+    body = orjson.dumps(fields)
+    return app.response_class(
+        body[:-1] + b',"' + raw_field.encode('utf-8') + b'":' + raw_json.encode('utf-8') + b'}',
+        mimetype='application/json'
+    )
+
 def get_today_date():
     """Get today's date in YYYY-MM-DD format"""
     return datetime.now().strftime('%Y-%m-%d')
@@ -169,10 +284,18 @@ def is_data_fresh(data_entry):
 # DATABASE-BASED CACHING FUNCTIONS (UPDATED WITH USER SUPPORT)
 # ============================================================================
 
+def find_holding_for_request(ticker, user_id):
+    """Find holding by ticker, memoized for the lifetime of the current request"""
+    lookups = g.setdefault('holding_lookups', {})
+    key = (ticker, user_id)
+    if key not in lookups:
+        lookups[key] = find_existing_holding_by_ticker(ticker, user_id)
+    return lookups[key]
+
 def get_cached_ratios_by_ticker(ticker, user_id):
     """Get cached ratios for a ticker if from today"""
     # Find holding by ticker first
-    existing_holding = find_existing_holding_by_ticker(ticker, user_id)
+    existing_holding = find_holding_for_request(ticker, user_id)
     if not existing_holding:
         return None
     
@@ -180,13 +303,13 @@ def get_cached_ratios_by_ticker(ticker, user_id):
     cached_ratios = get_ratios_cache(existing_holding['id'])
     if cached_ratios and is_data_fresh(cached_ratios):
         print(f"💾 [CACHE] Using cached ratios for {ticker} from {cached_ratios['date']}")
-        return cached_ratios['data']
+        return cached_ratios
     
     return None
 
 def save_ratios_to_cache_by_ticker(ticker, ratios_data, user_id):
     """Save ratios data to database with today's date"""
-    existing_holding = find_existing_holding_by_ticker(ticker, user_id)
+    existing_holding = find_holding_for_request(ticker, user_id)
     if not existing_holding:
         print(f"⚠️  [CACHE] No holding found for {ticker} to save ratios")
         return
@@ -199,20 +322,20 @@ def save_ratios_to_cache_by_ticker(ticker, ratios_data, user_id):
 
 def get_cached_quarterly_by_ticker(ticker, user_id):
     """Get cached quarterly data for a ticker if from today"""
-    existing_holding = find_existing_holding_by_ticker(ticker, user_id)
+    existing_holding = find_holding_for_request(ticker, user_id)
     if not existing_holding:
         return None
     
     cached_quarterly = get_quarterly_cache(existing_holding['id'])
     if cached_quarterly and is_data_fresh(cached_quarterly):
         print(f"💾 [CACHE] Using cached quarterly data for {ticker} from {cached_quarterly['date']}")
-        return cached_quarterly['data']
+        return cached_quarterly
     
     return None
 
 def save_quarterly_to_cache_by_ticker(ticker, quarterly_data, user_id):
     """Save quarterly data to database with today's date"""
-    existing_holding = find_existing_holding_by_ticker(ticker, user_id)
+    existing_holding = find_holding_for_request(ticker, user_id)
     if not existing_holding:
         print(f"⚠️  [CACHE] No holding found for {ticker} to save quarterly data")
         return
@@ -227,25 +350,104 @@ def save_quarterly_to_cache_by_ticker(ticker, quarterly_data, user_id):
 # EXTERNAL DATA PROVIDERS
 # ============================================================================
 
+def fetch_page(url):
+    """GET url with cached validators; returns (response, cached_payload)
+    
+    cached_payload is set (and response is None) when the page is known to be
+    unchanged, either via a 304 or a still-fresh entry without validators.
+    """
+    with page_cache_lock:
+        entry = page_cache.get(url)
+    
+    headers = {}
+    if entry:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        if not headers and time.time() - entry['fetched_at'] < PAGE_CACHE_TTL_SECONDS:
+            return None, entry['payload']
+    
+    response = http_session.get(url, headers=headers, timeout=10)
+    if response.status_code == 304 and entry:
+        with page_cache_lock:
+            entry['fetched_at'] = time.time()
+        return None, entry['payload']
+    
+    return response, None
+
+def remember_page(url, response, payload):
+    """Store the parsed payload of a page along with its cache validators"""
+    with page_cache_lock:
+        page_cache[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'payload': payload,
+            'fetched_at': time.time()
+        }
+
+def coalesce(key, fn, *args):
+    """Run fn(*args) once per key at a time; concurrent callers share its result"""
+    with inflight_lock:
+        future = inflight_scrapes.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            inflight_scrapes[key] = future
+    
+    if not is_owner:
+        return future.result()
+    
+    try:
+        result = fn(*args)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with inflight_lock:
+            inflight_scrapes.pop(key, None)
+
+def price_writer_loop():
+    """Drain queued price updates and persist them in batched transactions"""
+    while True:
+        holding_id, price_updates = price_write_queue.get()
+        
+        # Later updates for the same holding replace earlier ones
+        batch = {holding_id: dict(price_updates)}
+        while len(batch) < PRICE_WRITE_BATCH_SIZE:
+            try:
+                holding_id, price_updates = price_write_queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.setdefault(holding_id, {}).update(price_updates)
+        
+        try:
+            bulk_update_holding_prices(list(batch.items()))
+        except Exception as e:
+            print(f"❌ [DB] Failed to persist {len(batch)} price updates: {e}")
+        
+        time.sleep(PRICE_WRITE_INTERVAL_SECONDS)
+
+@ttl_memo(SCRAPE_MEMO_TTL_SECONDS, SCRAPE_MEMO_MAXSIZE, should_cache=lambda result: bool(result[0]))
 def get_company_name_from_screener(ticker):
     """Extract company name from Screener.in using ticker"""
     url = f"https://www.screener.in/company/{ticker}/consolidated/"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response, cached_name = fetch_page(url)
+        if cached_name:
+            return cached_name, url
         if response.status_code != 200:
             return None, url
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        div = soup.find('div', {'class': 'flex-row flex-wrap flex-align-center flex-grow'})
-        if div:
-            h1 = div.find('h1', {'class': 'margin-0 show-from-tablet-landscape'})
-            if h1:
-                return h1.text.strip(), url
+        # Parse the raw bytes to skip requests' charset detection and decoding
+        h1 = LexborHTMLParser(response.content).css_first(SCREENER_NAME_SELECTOR)
+        if h1:
+            company_name = h1.text().strip()
+            remember_page(url, response, company_name)
+            return company_name, url
         
         return None, url
         
@@ -253,144 +455,149 @@ def get_company_name_from_screener(ticker):
         print(f"Error fetching from screener: {e}")
         return None, url
 
+@ttl_memo(SCRAPE_MEMO_TTL_SECONDS, SCRAPE_MEMO_MAXSIZE)
 def get_kotak_price_from_url(kotak_url):
     """Get current price, previous close, and price change from Kotak URL"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
+    return coalesce(('kotak', kotak_url), scrape_kotak_price, kotak_url)
+
+def scrape_kotak_price(kotak_url):
+    """Scrape the Kotak stock page for price data"""
     try:
-        response = requests.get(kotak_url, headers=headers, timeout=10)
+        response, cached_data = fetch_page(kotak_url)
+        if cached_data:
+            return cached_data
         if response.status_code != 200:
             return None
             
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        price_container = soup.find('div', {'class': re.compile('TitleGridAndImage_title-grid-and-image-price.*')})
-        
-        current_price = None
-        price_change_full = None
-        
-        if price_container:
-            price_div = price_container.find('div', {'class': re.compile('TitleGridAndImage_title-grid-and-image-price-text.*kotak-heading-2')})
-            if price_div:
-                current_price = price_div.text.strip()
-            
-            change_div = price_container.find('div', {'class': re.compile('kotak-text-regular.*TitleGridAndImage_title-grid-and-image-price-subtext.*')})
-            if change_div:
-                price_change_full = change_div.text.strip()
-        
-        # Extract previous close
-        previous_close = None
-        table_rows = soup.find_all('tr', {'class': re.compile('StockDetail_stock-detail-performance-table-data-row.*')})
-        
-        for row in table_rows:
-            label_cell = row.find('td', {'class': re.compile('StockDetail_stock-detail-performance-table-label.*')})
-            if label_cell and 'Prev. Close' in label_cell.text:
-                value_cell = row.find('td', {'class': re.compile('StockDetail_stock-detail-performance-table-value.*')})
-                if value_cell:
-                    # Clean the previous close value to extract just the number
-                    prev_close_text = value_cell.text.strip()
-                    prev_close_cleaned = re.sub(r'[^\d.]', '', prev_close_text)
-                    previous_close = prev_close_cleaned if prev_close_cleaned else "0"
-                break
-
-        # Parse price change components
-        price_change_amount = None
-        price_change_percent = None
-        
-        if price_change_full:
-            amount_match = re.search(r'^([+-]?[\d.]+)', price_change_full.strip())
-            if amount_match:
-                price_change_amount = amount_match.group(1)
-            
-            percent_match = re.search(r'\(([+-]?[\d.]+%)\)', price_change_full)
-            if percent_match:
-                price_change_percent = percent_match.group(1)
-        
-        return {
-            'price': current_price,
-            'previous_close': previous_close,
-            'price_change_amount': price_change_amount,
-            'price_change_percent': price_change_percent
-        }
+        kotak_data = parse_kotak_page(response.content)
+        remember_page(kotak_url, response, kotak_data)
+        return kotak_data
             
     except Exception as e:
         print(f"Error fetching Kotak data: {e}")
         return None
 
+def format_kotak_slug(text):
+    """Turn a company name into a Kotak URL slug"""
+    text = PAREN_GROUP_RE.sub(r'\1', text.lower())
+    text = NON_WORD_RE.sub('', text)
+    return SLUG_SEPARATOR_RE.sub('-', text).strip('-')
+
+def is_kotak_stock_page(url):
+    """Check that a (possibly redirected) URL still points at a Kotak stock page"""
+    path = urlsplit(url).path
+    return path.startswith('/stocks/') and path.strip('/') != 'stocks' and '404' not in path
+
 def find_working_kotak_url(company_name):
-    """Try multiple variations of company name to find the correct Kotak URL"""
+    """Try name variations for a Kotak URL, returning (price, url, all_missed)"""
+    
+    def strip_company_suffix(name):
+        if name.endswith(' Ltd'):
+            return name[:-4]
+        if name.endswith(' Limited'):
+            return name[:-8]
+        return name
+    
+    def without_parentheses(name):
+        return SPACE_RE.sub(' ', PAREN_RE.sub('', name).strip())
     
     def create_base_url_variations(name):
-        variations = []
         clean_name = name.strip()
+        short_name = strip_company_suffix(clean_name)
+        candidates = (
+            clean_name,
+            without_parentheses(clean_name),
+            short_name,
+            without_parentheses(short_name),
+        )
         
-        def format_for_url(text):
-            text = text.lower()
-            text = re.sub(r'\(([^)]*)\)', r'\1', text)
-            text = re.sub(r'[^\w\s-]', '', text)
-            text = text.replace(' ', '-')
-            text = re.sub(r'-+', '-', text)
-            return text.strip('-')
-        
-        var1 = format_for_url(clean_name)
-        variations.append(var1)
-        
-        var2 = re.sub(r'\([^)]*\)', '', clean_name).strip()
-        var2 = re.sub(r'\s+', ' ', var2)
-        var2 = format_for_url(var2)
-        if var2 != var1:
-            variations.append(var2)
-        
-        var3 = clean_name
-        if var3.endswith(' Ltd'):
-            var3 = var3[:-4]
-        elif var3.endswith(' Limited'):
-            var3 = var3[:-8]
-        var3 = format_for_url(var3)
-        if var3 != var1 and var3 != var2:
-            variations.append(var3)
-        
-        var4 = clean_name
-        if var4.endswith(' Ltd'):
-            var4 = var4[:-4]
-        elif var4.endswith(' Limited'):
-            var4 = var4[:-8]
-        var4 = re.sub(r'\([^)]*\)', '', var4).strip()
-        var4 = re.sub(r'\s+', ' ', var4)
-        var4 = format_for_url(var4)
-        if var4 not in [var1, var2, var3]:
-            variations.append(var4)
-        
+        # Names like "Foo Ltd" often collapse to the same slug; probe each slug once
+        seen = set()
+        variations = []
+        for slug in map(format_kotak_slug, candidates):
+            if slug and slug not in seen:
+                seen.add(slug)
+                variations.append(slug)
         return variations
     
     base_variations = create_base_url_variations(company_name)
     all_variations = base_variations + [f"bse-{var}" for var in base_variations]
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    # Probes and fetches let requests.RequestException through, so a network
+    # failure is not mistaken for a company that has no Kotak page
+    def probe_kotak_url(url):
+        """Cheap existence check: HEAD, or a tiny ranged GET if HEAD is refused"""
+        response = http_session.head(url, timeout=5, allow_redirects=True)
+        if response.status_code in (405, 501):
+            response = http_session.get(url, headers={'Range': 'bytes=0-4095'}, timeout=5, stream=True)
+            response.close()
+            ok = response.status_code in (200, 206)
+        else:
+            ok = response.status_code == 200
+        
+        # Unknown slugs can redirect to a 200 "not found" or listing page
+        return ok and is_kotak_stock_page(response.url)
     
-    for i, company_name_url in enumerate(all_variations, 1):
-        url = f"https://www.kotaksecurities.com/stocks/{company_name_url}/"
+    def fetch_kotak_price(url):
+        response = http_session.get(url, timeout=10)
+        if response.status_code == 200:
+            return parse_kotak_price_text(response.content)
         
+        return None
+    
+    def probe_and_fetch(url):
+        return fetch_kotak_price(url) if probe_kotak_url(url) else None
+    
+    # Each variation is probed and, if it exists, fetched on its own worker,
+    # so the search takes one probe + one fetch round trip however many variations miss.
+    # Results are taken in variation order, so base slugs win over their bse- duplicates
+    urls = [f"https://www.kotaksecurities.com/stocks/{var}/" for var in all_variations]
+    futures = [price_executor.submit(probe_and_fetch, url) for url in urls]
+    # Stays True only if every variation was definitively absent, not unreachable
+    all_missed = True
+    for url, future in zip(urls, futures):
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                price_div = soup.find('div', {'class': re.compile('TitleGridAndImage_title-grid-and-image-price-text.*kotak-heading-2')})
-                if price_div:
-                    price = price_div.text.strip()
-                    print(f"✅ Found Kotak price: {price} at {url}")
-                    return price, url
-                    
-        except Exception:
+            price = future.result()
+        except requests.RequestException as e:
+            print(f"⚠️ Kotak request failed for {url}: {e}")
+            all_missed = False
             continue
+        
+        if price:
+            for pending in futures:
+                pending.cancel()
+            print(f"✅ Found Kotak price: {price} at {url}")
+            return price, url, False
     
     print(f"❌ All Kotak URL attempts failed for {company_name}")
-    return None, None
+    return None, None, all_missed
+
+def resolve_kotak_url(company_name):
+    """Find a company's Kotak URL, skipping companies that failed recently"""
+    if kotak_url_failed_recently(company_name, KOTAK_URL_RETRY_HOURS):
+        print(f"⏭️ Skipping Kotak URL search for {company_name} (failed recently)")
+        return None, None
+    
+    # Concurrent requests for the same new company share one probe run
+    kotak_price, kotak_url, all_missed = coalesce(('kotak-search', company_name), find_working_kotak_url, company_name)
+    if kotak_url:
+        clear_kotak_url_failure(company_name)
+    elif all_missed:
+        # Only a definitive miss on every variation is remembered; network
+        # errors leave the company to be retried on the next request
+        record_kotak_url_failure(company_name)
+    return kotak_price, kotak_url
+
+def ensure_kotak_url(company):
+    """Return the stored Kotak URL, discovering and saving it if missing"""
+    if company['kotak_url']:
+        return company['kotak_url']
+    
+    _, kotak_url = resolve_kotak_url(company['name'])
+    if kotak_url:
+        update_company_kotak_url(company['id'], company['name'], kotak_url)
+        company['kotak_url'] = kotak_url
+    return kotak_url
 
 # ============================================================================
 # API ROUTES
@@ -438,7 +645,8 @@ def get_stock_price():
         response_data = {}
         
         if company_data:
-            kotak_data = get_kotak_price_from_url(company_data['kotak_url'])
+            kotak_url = ensure_kotak_url(company_data)
+            kotak_data = get_kotak_price_from_url(kotak_url) if kotak_url else None
             if kotak_data and kotak_data['price']:
                 response_data = {
                     "name": company_data['name'],
@@ -463,11 +671,12 @@ def get_stock_price():
                 screener_urls = existing_company['screener_urls']
                 screener_urls[ticker] = screener_url
                 
+                kotak_url = ensure_kotak_url(existing_company)
                 company_id = get_or_create_company(
-                    company_name, tickers, screener_urls, existing_company['kotak_url']
+                    company_name, tickers, screener_urls, kotak_url
                 )
                 
-                kotak_data = get_kotak_price_from_url(existing_company['kotak_url'])
+                kotak_data = get_kotak_price_from_url(kotak_url) if kotak_url else None
                 if kotak_data and kotak_data['price']:
                     response_data = {
                         "name": company_name,
@@ -478,7 +687,7 @@ def get_stock_price():
                     }
             else:
                 # Create completely new company
-                kotak_price, kotak_url = find_working_kotak_url(company_name)
+                kotak_price, kotak_url = resolve_kotak_url(company_name)
                 if not kotak_price or not kotak_url:
                     return jsonify({"error": "Price not found"}), 404
                 
@@ -512,17 +721,18 @@ def get_stock_ratios(ticker):
         # Try to get cached ratios first
         cached_ratios = get_cached_ratios_by_ticker(ticker, user_id)
         if cached_ratios:
-            return jsonify({
-                'ticker': ticker,
-                'ratios': cached_ratios,
-                'count': len(cached_ratios),
-                'cached': True,
-                'source': 'database_cache'
-            })
+            # Serve the stored JSON as-is instead of decoding and re-encoding it
+            return raw_json_response(
+                'ratios', cached_ratios['data_json'],
+                ticker=ticker,
+                count=cached_ratios['count'],
+                cached=True,
+                source='database_cache'
+            )
         
         # Scrape fresh ratios
         print(f"🔄 [SCRAPER] Scraping fresh ratios for {ticker}")
-        fresh_ratios = scrape_screener_ratios(ticker)
+        fresh_ratios = coalesce(('ratios', ticker), scrape_screener_ratios, ticker)
         
         if fresh_ratios:
             save_ratios_to_cache_by_ticker(ticker, fresh_ratios, user_id)
@@ -555,15 +765,15 @@ def get_quarterly_results(ticker):
         # Try to get cached quarterly data first
         cached_quarterly = get_cached_quarterly_by_ticker(ticker, user_id)
         if cached_quarterly:
-            return jsonify({
-                'quarterly_data': cached_quarterly,
-                'cached': True,
-                'source': 'database_cache'
-            })
+            return raw_json_response(
+                'quarterly_data', cached_quarterly['data_json'],
+                cached=True,
+                source='database_cache'
+            )
         
         # Scrape fresh quarterly data
         print(f"🔄 [SCRAPER] Scraping fresh quarterly data for {ticker}")
-        fresh_quarterly = scrape_quarterly_results(ticker)
+        fresh_quarterly = coalesce(('quarterly', ticker), scrape_quarterly_results, ticker)
         
         if fresh_quarterly:
             save_quarterly_to_cache_by_ticker(ticker, fresh_quarterly, user_id)
@@ -582,43 +792,73 @@ def get_quarterly_results(ticker):
 @app.route('/api/holdings', methods=['GET'])
 @jwt_required
 def get_holdings():
-    """Get all holdings with updated market prices"""
+    """Get all holdings with their last known market prices"""
     try:
         current_user = get_current_user()
         user_id = current_user['user_id']
         
+        # Live prices are served separately by /api/holdings/prices
         holdings = get_all_holdings(user_id)
         
-        # Update market data for all holdings
-        for holding in holdings:
-            # Find company data for price updates
-            company_data = find_company_by_ticker(holding['ticker'])
-            if company_data:
-                kotak_data = get_kotak_price_from_url(company_data['kotak_url'])
-                if kotak_data:
-                    price_updates = {}
-                    if kotak_data['price']:
-                        price_updates['marketPrice'] = f"₹{kotak_data['price']}"
-                        holding['marketPrice'] = f"₹{kotak_data['price']}"
-                    if kotak_data['previous_close']:
-                        price_updates['previousClose'] = kotak_data['previous_close']
-                        holding['previousClose'] = kotak_data['previous_close']
-                    if kotak_data['price_change_amount']:
-                        price_updates['priceChangeAmount'] = kotak_data['price_change_amount']
-                        holding['priceChangeAmount'] = kotak_data['price_change_amount']
-                    if kotak_data['price_change_percent']:
-                        price_updates['priceChangePercent'] = kotak_data['price_change_percent']
-                        holding['priceChangePercent'] = kotak_data['price_change_percent']
-                    
-                    # Update database
-                    if price_updates:
-                        update_holding_prices(holding['id'], price_updates)
-        
         return jsonify({"holdings": holdings})
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/holdings/prices', methods=['GET'])
+@jwt_required
+def stream_holding_prices():
+    """Stream live market prices for holdings as server-sent events"""
+    try:
+        current_user = get_current_user()
+        user_id = current_user['user_id']
+        
+        requested_ids = {holding_id for holding_id in request.args.get('ids', '').split(',') if holding_id}
+        
+        # Holdings that share a Kotak page (e.g. NSE and BSE tickers of one company) share a fetch
+        holdings_by_url = {}
+        for holding in get_all_holdings(user_id):
+            if holding['kotak_url'] and (not requested_ids or holding['id'] in requested_ids):
+                holdings_by_url.setdefault(holding['kotak_url'], []).append(holding)
+        
+        # Fetch market data for all pages in parallel
+        futures = {
+            price_executor.submit(get_kotak_price_from_url, kotak_url): kotak_url
+            for kotak_url in holdings_by_url
+        }
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    def generate():
+        for future in as_completed(futures):
+            kotak_data = future.result()
+            if not kotak_data:
+                continue
+            
+            price_updates = {}
+            if kotak_data['price']:
+                price_updates['marketPrice'] = f"₹{kotak_data['price']}"
+            if kotak_data['previous_close']:
+                price_updates['previousClose'] = kotak_data['previous_close']
+            if kotak_data['price_change_amount']:
+                price_updates['priceChangeAmount'] = kotak_data['price_change_amount']
+            if kotak_data['price_change_percent']:
+                price_updates['priceChangePercent'] = kotak_data['price_change_percent']
+            
+            if not price_updates:
+                continue
+            
+            for holding in holdings_by_url[futures[future]]:
+                # Persist in the background so the next listing starts from these prices
+                if any(holding[field] != value for field, value in price_updates.items()):
+                    price_write_queue.put_nowait((holding['id'], price_updates))
+                yield f"data: {app.json.dumps({'id': holding['id'], **price_updates})}\n\n"
+        
+        yield "event: done\ndata: {}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/holdings', methods=['POST'])
 @jwt_required
 def add_holding():
@@ -718,16 +958,13 @@ def sell_holding_quantity(holding_id):
         if sell_quantity <= 0:
             return jsonify({"error": "Sell quantity must be positive"}), 400
 
-        success = sell_holding_shares(holding_id, sell_quantity)
+        remaining_quantity = sell_holding_shares(holding_id, sell_quantity)
         
-        if not success:
+        if remaining_quantity is None:
             return jsonify({"error": "Holding not found"}), 404
 
-        # Check if holding still exists (partial sell) or was completely sold
-        remaining_holding = get_holding_by_id(holding_id)
-        
-        if remaining_holding:
-            message = f"Sold {sell_quantity} shares, {remaining_holding['quantity']} remaining"
+        if remaining_quantity:
+            message = f"Sold {sell_quantity} shares, {remaining_quantity} remaining"
         else:
             message = "Holding fully sold and removed"
 
@@ -769,8 +1006,18 @@ def test_scraper_route():
 # APPLICATION STARTUP
 # ============================================================================
 
+def startup():
+    """Initialize the database and start the background price writer"""
+    # Kept out of import time: scrape worker processes are spawned, and each
+    # one re-imports this module without needing the database or the writer
+    init_database()
+    print("🗄️ SQLite database initialized")
+    
+    Thread(target=price_writer_loop, name='price-writer', daemon=True).start()
+
 if __name__ == '__main__':
     print("🚀 Starting Stock Portfolio App with SQLite...")
+    startup()
     
     # Get database stats
     companies = get_companies_for_suggestions('')
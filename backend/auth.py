@@ -5,8 +5,15 @@ Handles JWT tokens, password hashing, and user authentication
 
 import bcrypt
 import jwt
+import time
+from hmac import compare_digest
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from functools import wraps
+from typing import Mapping
 from flask import request, jsonify, current_app
 from database import get_user_by_username, get_user_by_email, get_user_by_id, create_user
 
@@ -16,18 +23,45 @@ import os
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', os.urandom(32).hex())  # Auto-generate secure key
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+JWT_REQUIRED_CLAIMS = ['exp', 'iat', 'user_id', 'username']  # Tokens missing any of these are rejected
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))  # bcrypt cost factor for new hashes
 
+# Recently verified tokens, so repeat requests skip signature verification.
+# Entries never outlive the token's own exp claim.
+JWT_CACHE_SIZE = 4096
+JWT_CACHE_TTL_SECONDS = 300
+verified_tokens = OrderedDict()
+verified_tokens_lock = Lock()
 
-def hash_password(password: str) -> str:
+# Shared, read-only results for rejected tokens (no allocation per failure)
+TOKEN_EXPIRED_ERROR = MappingProxyType({'error': 'Token has expired'})
+TOKEN_INVALID_ERROR = MappingProxyType({'error': 'Invalid token'})
+
+# bcrypt releases the GIL while hashing, so a thread pool sized to the CPU
+# count runs hashes on every core while keeping a signup or login burst from
+# oversubscribing them
+HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='bcrypt')
+
+# Checked against when a login names an unknown user, so that path costs
+# the same bcrypt work as a wrong password
+DUMMY_PASSWORD_HASH = bcrypt.hashpw(b'stockdash-dummy-password', bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
     """Hash a password using bcrypt"""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+    salt = bcrypt.gensalt(rounds=rounds)
+    return HASH_POOL.submit(bcrypt.hashpw, password_bytes, salt).result().decode('utf-8')
 
 
 def verify_password(password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return HASH_POOL.submit(bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8')).result()
+
+
+def tokens_equal(a: str, b: str) -> bool:
+    """Constant-time string comparison for tokens and other secrets"""
+    return compare_digest(a.encode('utf-8'), b.encode('utf-8'))
 
 
 def generate_jwt_token(user_id: int, username: str) -> str:
@@ -42,15 +76,34 @@ def generate_jwt_token(user_id: int, username: str) -> str:
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 
-def decode_jwt_token(token: str) -> dict:
-    """Decode and validate JWT token"""
+def decode_jwt_token(token: str) -> Mapping:
+    """Decode and validate JWT token (returns an error sentinel on failure)"""
+    now = time.time()
+    with verified_tokens_lock:
+        entry = verified_tokens.get(token)
+        if entry:
+            if entry[0] > now:
+                verified_tokens.move_to_end(token)
+                return entry[1]
+            del verified_tokens[token]
+    
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = jwt.decode(
+            token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM],
+            options={'require': JWT_REQUIRED_CLAIMS}
+        )
     except jwt.ExpiredSignatureError:
-        return {'error': 'Token has expired'}
+        return TOKEN_EXPIRED_ERROR
     except jwt.InvalidTokenError:
-        return {'error': 'Invalid token'}
+        return TOKEN_INVALID_ERROR
+    
+    expires_at = min(now + JWT_CACHE_TTL_SECONDS, payload['exp'])
+    with verified_tokens_lock:
+        verified_tokens[token] = (expires_at, payload)
+        if len(verified_tokens) > JWT_CACHE_SIZE:
+            verified_tokens.popitem(last=False)
+    
+    return payload
 
 
 def register_user(username: str, email: str, password: str, first_name: str = '', last_name: str = '') -> dict:
@@ -103,6 +156,7 @@ def login_user(username: str, password: str) -> dict:
         user = get_user_by_email(username)  # Allow login with email
     
     if not user:
+        verify_password(password, DUMMY_PASSWORD_HASH)
         return {'error': 'User not found'}
     
     # Verify password
@@ -140,7 +194,7 @@ def jwt_required(f):
         
         # Decode token
         payload = decode_jwt_token(token)
-        if 'error' in payload:
+        if payload is TOKEN_EXPIRED_ERROR or payload is TOKEN_INVALID_ERROR:
             return jsonify({'error': payload['error']}), 401
         
         # Add user info to request context
@@ -165,7 +219,7 @@ def test_auth():
     
     # Test password hashing
     password = "test123"
-    hashed = hash_password(password)
+    hashed = hash_password(password, rounds=4)  # Minimum cost; this hash is thrown away
     print(f"✅ Password hashed: {hashed[:20]}...")
     
     # Test password verification
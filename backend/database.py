@@ -4,37 +4,140 @@ SQLite database setup and operations for Stock Portfolio Management System
 """
 
 import sqlite3
-import json
-import os
+import orjson
+import queue
+import secrets
+import threading
 from datetime import datetime
+from collections import defaultdict
 from contextlib import contextmanager
-from typing import Dict, List, Optional, Any
+from itertools import islice
+from typing import Dict, List, Optional, Any, Tuple
 
 
 # Database configuration
 DATABASE_PATH = 'portfolio.db'
+READ_POOL_SIZE = 8
+STATEMENT_CACHE_SIZE = 512  # Prepared statements kept per connection
+SQL_PARAM_CHUNK_SIZE = 900  # Stays under SQLite's default 999 bound-parameter limit
+
+# Read-only connections are kept on a LIFO stack so the most recently
+# used (cache-warm) connection is handed out first
+_read_pool = queue.LifoQueue(maxsize=READ_POOL_SIZE)
+
+# All writes go through one shared connection guarded by a lock
+_write_lock = threading.Lock()
+_write_conn = None
+
+# Stored in PRAGMA user_version; bump whenever init_database's DDL changes
+SCHEMA_VERSION = 1
+
+# Hot lookup statements, built once so every call hits the statement cache
+USER_COLUMNS = ('id', 'username', 'email', 'password_hash', 'first_name', 'last_name', 'created_at', 'updated_at')
+SQL_USER_BY_USERNAME = f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE username = ?"
+SQL_USER_BY_EMAIL = f"SELECT {', '.join(USER_COLUMNS)} FROM users WHERE email = ?"
+# Lookups by id never need the password hash, so it is not read
+USER_PROFILE_COLUMNS = ('id', 'username', 'email', 'first_name', 'last_name', 'created_at', 'updated_at')
+SQL_USER_BY_ID = f"SELECT {', '.join(USER_PROFILE_COLUMNS)} FROM users WHERE id = ?"
+
+# Holding rows joined with their company, read as plain tuples and zipped
+# against this fixed key tuple. The display 'price' is derived from avgPrice
+# on read (see _holding_from_row), so the stored column is not selected.
+HOLDING_KEYS = (
+    'id', 'user_id', 'company_id', 'name', 'symbol', 'ticker', 'quantity', 'avgPrice',
+    'marketPrice', 'previousClose', 'priceChangeAmount', 'priceChangePercent',
+    'exchange', 'date', 'created_at', 'updated_at', 'company_name', 'tickers', 'kotak_url'
+)
+SQL_SELECT_HOLDINGS = """
+    SELECT h.id, h.user_id, h.company_id, h.name, h.symbol, h.ticker, h.quantity, h.avgPrice,
+           h.marketPrice, h.previousClose, h.priceChangeAmount, h.priceChangePercent,
+           h.exchange, h.date, h.created_at, h.updated_at, c.name, c.tickers, c.kotak_url
+    FROM holdings h
+    JOIN companies c ON h.company_id = c.id
+"""
+
+# Insert statements shared by the single-row and bulk helpers
+SQL_INSERT_HOLDING = """
+    INSERT INTO holdings (
+        id, user_id, company_id, name, symbol, ticker, quantity, avgPrice,
+        price, marketPrice, previousClose, priceChangeAmount, 
+        priceChangePercent, exchange, date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SQL_INSERT_PURCHASE = """
+    INSERT INTO purchases (holding_id, date, quantity, price, user_id)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+COMPANY_KEYS = ('id', 'name', 'tickers', 'screener_urls', 'kotak_url', 'created_at')
+
+# Ticker -> company map and name-ordered search list, built from the
+# database on first lookup and dropped whenever a company row changes
+_company_index = None
+_company_index_version = 0
+_company_index_lock = threading.Lock()
 
 
 def get_db_connection():
     """Create and return database connection with proper settings"""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
     conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
     conn.execute('PRAGMA foreign_keys = ON')  # Enable foreign key constraints
+    conn.execute('PRAGMA synchronous = NORMAL')  # Under WAL, fsync at checkpoints rather than every commit
+    conn.execute('PRAGMA cache_size = -65536')  # 64 MB page cache
+    conn.execute('PRAGMA mmap_size = 268435456')  # 256 MB memory-mapped I/O
+    conn.execute('PRAGMA temp_store = MEMORY')  # Keep sort/temp b-trees off disk
+    return conn
+
+
+def get_read_connection():
+    """Create a read-only database connection tuned for lookups"""
+    conn = sqlite3.connect(
+        f'file:{DATABASE_PATH}?mode=ro', uri=True, check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA cache_size = -65536')  # 64 MB page cache
+    conn.execute('PRAGMA mmap_size = 268435456')  # 256 MB memory-mapped I/O
+    conn.execute('PRAGMA temp_store = MEMORY')  # Keep sort/temp b-trees off disk
+    conn.execute('PRAGMA query_only = 1')
     return conn
 
 
 @contextmanager
 def get_db():
-    """Context manager for database connections"""
-    conn = get_db_connection()
+    """Context manager for the shared writer connection"""
+    global _write_conn
+    
+    with _write_lock:
+        if _write_conn is None:
+            _write_conn = get_db_connection()
+        
+        conn = _write_conn
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+@contextmanager
+def read_conn():
+    """Context manager that borrows a connection from the read pool"""
+    try:
+        conn = _read_pool.get_nowait()
+    except queue.Empty:
+        conn = get_read_connection()
+    
     try:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
     finally:
-        conn.close()
+        try:
+            _read_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
 
 
 def init_database():
@@ -44,6 +147,19 @@ def init_database():
     with get_db() as conn:
         cursor = conn.cursor()
 
+        # WAL lets readers proceed while a write transaction commits
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
+        # A current schema needs no DDL; skip straight to the planner refresh
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            cursor.execute("PRAGMA optimize")
+            print("✅ Database schema is up to date!")
+            return
+        
+        # Run all schema changes in one transaction, stamped with the version
+        cursor.execute("BEGIN IMMEDIATE")
+
         # 0. Users table (ADD THIS FIRST)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -71,6 +187,44 @@ def init_database():
             )
         """)
         
+        # 1a. Ticker -> company lookup table (one row per ticker), clustered on
+        # the ticker so a lookup is a single B-tree probe
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'company_tickers'")
+        existing = cursor.fetchone()
+        company_tickers_exists = existing is not None
+        if company_tickers_exists and 'WITHOUT ROWID' not in existing['sql']:
+            # Derived from companies.tickers, so an older layout is simply rebuilt
+            cursor.execute("DROP TABLE company_tickers")
+            company_tickers_exists = False
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS company_tickers (
+                ticker TEXT PRIMARY KEY COLLATE NOCASE,  -- Stored upper-cased: "ITC.NS"
+                company_id INTEGER NOT NULL,
+                screener_url TEXT,
+                FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        if not company_tickers_exists:
+            # Backfill by expanding the JSON columns with json_each in SQLite;
+            # in id order, so a shared ticker keeps its first owner as in
+            # _save_company_tickers
+            cursor.execute("""
+                INSERT OR IGNORE INTO company_tickers (ticker, company_id, screener_url)
+                SELECT upper(t.value), c.id, u.value
+                FROM companies c
+                JOIN json_each(c.tickers) t
+                LEFT JOIN json_each(c.screener_urls) u ON u.key = t.value
+                ORDER BY c.id, t.id
+            """)
+        
+        # 1b. Companies whose Kotak page could not be found (retried after a cool-down)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS kotak_url_failures (
+                name TEXT PRIMARY KEY,
+                failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
         # 2. Holdings table (MODIFIED - add user_id)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS holdings (
@@ -82,7 +236,7 @@ def init_database():
                 ticker TEXT NOT NULL,
                 quantity INTEGER NOT NULL DEFAULT 0,
                 avgPrice REAL NOT NULL DEFAULT 0.0,
-                price TEXT,  -- "₹405.00" format
+                price TEXT,  -- "₹405.00" format (legacy; readers derive it from avgPrice)
                 marketPrice TEXT,  -- "₹410.65" format
                 previousClose TEXT,  -- "411.55" format
                 priceChangeAmount TEXT,  -- "-0.90" format
@@ -144,6 +298,34 @@ def init_database():
         """)
 
         
+        # 1c. Trigram full-text index over company names and tickers for search suggestions
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'companies_fts'")
+        fts_exists = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
+                name, tickers, content='companies', content_rowid='id', tokenize='trigram'
+            )
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS companies_fts_insert AFTER INSERT ON companies BEGIN
+                INSERT INTO companies_fts (rowid, name, tickers) VALUES (new.id, new.name, new.tickers);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS companies_fts_delete AFTER DELETE ON companies BEGIN
+                INSERT INTO companies_fts (companies_fts, rowid, name, tickers) VALUES ('delete', old.id, old.name, old.tickers);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS companies_fts_update AFTER UPDATE OF name, tickers ON companies BEGIN
+                INSERT INTO companies_fts (companies_fts, rowid, name, tickers) VALUES ('delete', old.id, old.name, old.tickers);
+                INSERT INTO companies_fts (rowid, name, tickers) VALUES (new.id, new.name, new.tickers);
+            END
+        """)
+        if not fts_exists:
+            cursor.execute("INSERT INTO companies_fts (companies_fts) VALUES ('rebuild')")
+
+        
         # Create indexes for better performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_holdings_company ON holdings(company_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_holdings_ticker ON holdings(ticker)")
@@ -151,6 +333,7 @@ def init_database():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ratios_holding ON ratios_cache(holding_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_quarterly_holding ON quarterly_cache(holding_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_companies_name ON companies(name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_company_tickers_company ON company_tickers(company_id)")
         
         # User-related indexes (ADD THESE)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
@@ -159,12 +342,36 @@ def init_database():
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_purchases_user ON purchases(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_ratios_user ON ratios_cache(user_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_quarterly_user ON quarterly_cache(user_id)")
+        
+        # Composite indexes for per-user ticker and symbol lookups
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_holdings_user_ticker ON holdings(user_id, ticker)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_holdings_user_symbol ON holdings(user_id, symbol)")
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        
+        # Gather planner statistics once, then let SQLite refresh them as needed
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA optimize")
+        else:
+            cursor.execute("ANALYZE")
 
 
         print("✅ Database tables created successfully!")
         print("✅ Indexes created for better performance!")
 
 
+def _save_company_tickers(cursor: sqlite3.Cursor, company_id: int, tickers: List[str], screener_urls: Dict[str, str]):
+    """Replace a company's rows in the ticker lookup table"""
+    cursor.execute("DELETE FROM company_tickers WHERE company_id = ?", (company_id,))
+    
+    # A ticker already claimed by another company keeps its first owner
+    cursor.executemany("""
+        INSERT OR IGNORE INTO company_tickers (ticker, company_id, screener_url)
+        VALUES (?, ?, ?)
+    """, [(ticker.upper(), company_id, screener_urls.get(ticker)) for ticker in tickers])
+
+
 def get_or_create_company(name: str, tickers: List[str], screener_urls: Dict[str, str], kotak_url: str) -> int:
     """Get existing company or create new one, return company_id"""
     with get_db() as conn:
@@ -183,13 +390,12 @@ def get_or_create_company(name: str, tickers: List[str], screener_urls: Dict[str
                 SET tickers = ?, screener_urls = ?, kotak_url = ?
                 WHERE id = ?
             """, (
-                json.dumps(tickers),
-                json.dumps(screener_urls),
+                orjson.dumps(tickers).decode('utf-8'),
+                orjson.dumps(screener_urls).decode('utf-8'),
                 kotak_url,
                 company_id
             ))
-            
-            return company_id
+            _save_company_tickers(cursor, company_id, tickers, screener_urls)
         else:
             # Create new company
             cursor.execute("""
@@ -197,118 +403,173 @@ def get_or_create_company(name: str, tickers: List[str], screener_urls: Dict[str
                 VALUES (?, ?, ?, ?)
             """, (
                 name,
-                json.dumps(tickers),
-                json.dumps(screener_urls),
+                orjson.dumps(tickers).decode('utf-8'),
+                orjson.dumps(screener_urls).decode('utf-8'),
                 kotak_url
             ))
-            
-            return cursor.lastrowid
+            company_id = cursor.lastrowid
+            _save_company_tickers(cursor, company_id, tickers, screener_urls)
+    
+    _invalidate_company_index()
+    return company_id
+
+
+def update_company_kotak_url(company_id: int, name: str, kotak_url: str):
+    """Store a discovered Kotak URL and clear any recorded failure"""
+    with get_db() as conn:
+        conn.execute("UPDATE companies SET kotak_url = ? WHERE id = ?", (kotak_url, company_id))
+        conn.execute("DELETE FROM kotak_url_failures WHERE name = ?", (name,))
+    
+    _invalidate_company_index()
+
+
+def record_kotak_url_failure(name: str):
+    """Remember that no Kotak URL could be found for a company"""
+    with get_db() as conn:
+        conn.execute("""
+            INSERT INTO kotak_url_failures (name) VALUES (?)
+            ON CONFLICT(name) DO UPDATE SET failed_at = CURRENT_TIMESTAMP
+        """, (name,))
+
+
+def clear_kotak_url_failure(name: str):
+    """Forget a recorded Kotak URL failure"""
+    with get_db() as conn:
+        conn.execute("DELETE FROM kotak_url_failures WHERE name = ?", (name,))
+
+
+def kotak_url_failed_recently(name: str, within_hours: int) -> bool:
+    """Check whether a Kotak URL search for this company failed within the window"""
+    with read_conn() as conn:
+        row = conn.execute("""
+            SELECT 1 FROM kotak_url_failures
+            WHERE name = ? AND failed_at > datetime('now', ?)
+        """, (name, f'-{within_hours} hours')).fetchone()
+        return row is not None
+
+
+def _holding_row(holding_id: str, holding_data: Dict[str, Any]) -> Tuple:
+    """Parameters for SQL_INSERT_HOLDING"""
+    return (
+        holding_id,
+        holding_data['user_id'],  # NEW: Add user_id
+        holding_data['company_id'],
+        holding_data['name'],
+        holding_data['symbol'],
+        holding_data['ticker'],
+        holding_data['quantity'],
+        holding_data['avgPrice'],
+        holding_data.get('price', ''),
+        holding_data.get('marketPrice', ''),
+        holding_data.get('previousClose', ''),
+        holding_data.get('priceChangeAmount', ''),
+        holding_data.get('priceChangePercent', ''),
+        holding_data.get('exchange', 'NSE'),
+        holding_data['date']
+    )
 
 
 def create_holding(holding_data: Dict[str, Any]) -> str:
     """Create new holding record"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        
         # Generate ID if not provided
-        holding_id = holding_data.get('id') or os.urandom(8).hex()
+        holding_id = holding_data.get('id') or secrets.token_hex(8)
         
-        cursor.execute("""
-            INSERT INTO holdings (
-                id, user_id, company_id, name, symbol, ticker, quantity, avgPrice,
-                price, marketPrice, previousClose, priceChangeAmount, 
-                priceChangePercent, exchange, date
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            holding_id,
-            holding_data['user_id'],  # NEW: Add user_id
-            holding_data['company_id'],
-            holding_data['name'],
-            holding_data['symbol'],
-            holding_data['ticker'],
-            holding_data['quantity'],
-            holding_data['avgPrice'],
-            holding_data.get('price', ''),
-            holding_data.get('marketPrice', ''),
-            holding_data.get('previousClose', ''),
-            holding_data.get('priceChangeAmount', ''),
-            holding_data.get('priceChangePercent', ''),
-            holding_data.get('exchange', 'NSE'),
-            holding_data['date']
-        ))
+        conn.execute(SQL_INSERT_HOLDING, _holding_row(holding_id, holding_data))
         
         return holding_id
 
 
+def create_holdings_bulk(holdings_data: List[Dict[str, Any]]) -> List[str]:
+    """Create many holding records in a single transaction, return their ids"""
+    # One random read for the whole batch, sliced into 16-hex-digit ids
+    random_hex = secrets.token_hex(8 * len(holdings_data))
+    holding_ids = [
+        holding_data.get('id') or random_hex[i * 16:(i + 1) * 16]
+        for i, holding_data in enumerate(holdings_data)
+    ]
+    
+    with get_db() as conn:
+        conn.executemany(SQL_INSERT_HOLDING, [
+            _holding_row(holding_id, holding_data)
+            for holding_id, holding_data in zip(holding_ids, holdings_data)
+        ])
+    
+    return holding_ids
+
 
 def add_purchase(holding_id: str, date: str, quantity: int, price: float, user_id: int):
     """Add purchase record to holding"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO purchases (user_id, holding_id, date, quantity, price)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, holding_id, date, quantity, price))
+        conn.execute(SQL_INSERT_PURCHASE, (holding_id, date, quantity, price, user_id))
+
+
+def add_purchases_bulk(purchases: List[Tuple[str, str, int, float, int]]):
+    """Add many purchase records in a single transaction
+    
+    Each row is (holding_id, date, quantity, price, user_id), matching add_purchase.
+    """
+    if not purchases:
+        return
+    
+    with get_db() as conn:
+        conn.executemany(SQL_INSERT_PURCHASE, purchases)
+
+
+def _holding_from_row(row: Tuple) -> Dict[str, Any]:
+    """Build a holding dict from an SQL_SELECT_HOLDINGS row"""
+    holding = dict(zip(HOLDING_KEYS, row))
+    holding['price'] = f"₹{holding['avgPrice']:.2f}"
+    return holding
 
 
 def get_all_holdings(user_id: int = None) -> List[Dict[str, Any]]:
     """Get all holdings with their purchase history (optionally for specific user)"""
-    with get_db() as conn:
+    with read_conn() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples; dicts are built from HOLDING_KEYS
         
         # Get holdings (filter by user if provided)
         if user_id:
-            cursor.execute("""
-                SELECT h.*, c.name as company_name, c.tickers, c.kotak_url
-                FROM holdings h
-                JOIN companies c ON h.company_id = c.id
-                WHERE h.user_id = ?
-                ORDER BY h.created_at DESC
-            """, (user_id,))
+            cursor.execute(SQL_SELECT_HOLDINGS + " WHERE h.user_id = ? ORDER BY h.created_at DESC", (user_id,))
         else:
-            cursor.execute("""
-                SELECT h.*, c.name as company_name, c.tickers, c.kotak_url
-                FROM holdings h
-                JOIN companies c ON h.company_id = c.id
-                ORDER BY h.created_at DESC
-            """)
-        
-        holdings = []
-        for row in cursor.fetchall():
-            holding = dict(row)
+            cursor.execute(SQL_SELECT_HOLDINGS + " ORDER BY h.created_at DESC")
+        
+        holdings = [_holding_from_row(row) for row in cursor.fetchall()]
+        
+        # Get purchase history for all holdings at once, in chunks that stay
+        # under SQLite's bound-parameter limit
+        purchases_by_holding = defaultdict(list)
+        holding_ids = [holding['id'] for holding in holdings]
+        for start in range(0, len(holding_ids), SQL_PARAM_CHUNK_SIZE):
+            chunk = holding_ids[start:start + SQL_PARAM_CHUNK_SIZE]
+            cursor.execute(f"""
+                SELECT holding_id, date, quantity, price FROM purchases 
+                WHERE holding_id IN ({','.join('?' * len(chunk))}) ORDER BY date
+            """, chunk)
             
-            # Get purchase history
-            cursor.execute("""
-                SELECT date, quantity, price FROM purchases 
-                WHERE holding_id = ? ORDER BY date
-            """, (holding['id'],))
-            
-            purchases = [dict(p) for p in cursor.fetchall()]
-            holding['purchases'] = purchases
-            
-            holdings.append(holding)
+            for holding_id, date, quantity, price in cursor.fetchall():
+                purchases_by_holding[holding_id].append({'date': date, 'quantity': quantity, 'price': price})
+        
+        for holding in holdings:
+            holding['purchases'] = purchases_by_holding.get(holding['id'], [])
         
         return holdings
 
 
 def get_holding_by_id(holding_id: str) -> Optional[Dict[str, Any]]:
     """Get specific holding by ID"""
-    with get_db() as conn:
+    with read_conn() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = None
         
-        cursor.execute("""
-            SELECT h.*, c.name as company_name, c.tickers, c.kotak_url
-            FROM holdings h
-            JOIN companies c ON h.company_id = c.id
-            WHERE h.id = ?
-        """, (holding_id,))
+        cursor.execute(SQL_SELECT_HOLDINGS + " WHERE h.id = ?", (holding_id,))
         
         row = cursor.fetchone()
         if not row:
             return None
         
-        holding = dict(row)
+        holding = _holding_from_row(row)
         
         # Get purchase history
         cursor.execute("""
@@ -316,8 +577,10 @@ def get_holding_by_id(holding_id: str) -> Optional[Dict[str, Any]]:
             WHERE holding_id = ? ORDER BY date
         """, (holding_id,))
         
-        purchases = [dict(p) for p in cursor.fetchall()]
-        holding['purchases'] = purchases
+        holding['purchases'] = [
+            {'date': date, 'quantity': quantity, 'price': price}
+            for date, quantity, price in cursor.fetchall()
+        ]
         
         return holding
 
@@ -342,33 +605,56 @@ def update_holding_prices(holding_id: str, price_data: Dict[str, str]):
         ))
 
 
-def sell_holding_shares(holding_id: str, sell_quantity: int) -> bool:
-    """Sell shares from holding, return True if successful"""
+def bulk_update_holding_prices(updates: List[Tuple[str, Dict[str, str]]]):
+    """Update market prices for many holdings in a single transaction, skipping unchanged rows"""
+    if not updates:
+        return
+    
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("""
+            UPDATE holdings 
+            SET marketPrice = COALESCE(:marketPrice, marketPrice), previousClose = COALESCE(:previousClose, previousClose), 
+                priceChangeAmount = COALESCE(:priceChangeAmount, priceChangeAmount), priceChangePercent = COALESCE(:priceChangePercent, priceChangePercent),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = :id AND (
+                marketPrice IS NOT COALESCE(:marketPrice, marketPrice)
+                OR previousClose IS NOT COALESCE(:previousClose, previousClose)
+                OR priceChangeAmount IS NOT COALESCE(:priceChangeAmount, priceChangeAmount)
+                OR priceChangePercent IS NOT COALESCE(:priceChangePercent, priceChangePercent)
+            )
+        """, [
+            {
+                'marketPrice': price_data.get('marketPrice'),
+                'previousClose': price_data.get('previousClose'),
+                'priceChangeAmount': price_data.get('priceChangeAmount'),
+                'priceChangePercent': price_data.get('priceChangePercent'),
+                'id': holding_id
+            }
+            for holding_id, price_data in updates
+        ])
+
+
+def sell_holding_shares(holding_id: str, sell_quantity: int) -> Optional[int]:
+    """Sell shares from holding, return remaining quantity (0 if fully sold) or None if not found"""
     with get_db() as conn:
         cursor = conn.cursor()
         
-        # Get current quantity
-        cursor.execute("SELECT quantity FROM holdings WHERE id = ?", (holding_id,))
+        # Partial sell: decrement in place and read back the new quantity
+        cursor.execute("""
+            UPDATE holdings 
+            SET quantity = quantity - ?, updated_at = CURRENT_TIMESTAMP 
+            WHERE id = ? AND quantity > ?
+            RETURNING quantity
+        """, (sell_quantity, holding_id, sell_quantity))
         result = cursor.fetchone()
         
-        if not result:
-            return False
-        
-        current_quantity = result['quantity']
-        
-        if sell_quantity >= current_quantity:
-            # Delete entire holding
-            cursor.execute("DELETE FROM holdings WHERE id = ?", (holding_id,))
-        else:
-            # Update quantity
-            new_quantity = current_quantity - sell_quantity
-            cursor.execute("""
-                UPDATE holdings 
-                SET quantity = ?, updated_at = CURRENT_TIMESTAMP 
-                WHERE id = ?
-            """, (new_quantity, holding_id))
+        if result:
+            return result['quantity']
         
-        return True
+        # Selling everything (or more) removes the holding
+        cursor.execute("DELETE FROM holdings WHERE id = ?", (holding_id,))
+        return 0 if cursor.rowcount else None
 
 
 def save_ratios_cache(holding_id: str, ratios_data: Dict[str, Any], cache_date: str, updated_time: str, user_id: int):
@@ -383,19 +669,20 @@ def save_ratios_cache(holding_id: str, ratios_data: Dict[str, Any], cache_date:
         """, (
             user_id,
             holding_id,
-            json.dumps(ratios_data),
+            orjson.dumps(ratios_data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8'),
             cache_date,
             updated_time
         ))
 
 
 def get_ratios_cache(holding_id: str) -> Optional[Dict[str, Any]]:
-    """Get cached ratios for holding"""
-    with get_db() as conn:
+    """Get cached ratios for holding as the stored JSON text (not decoded)"""
+    with read_conn() as conn:
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT ratios_data, cache_date, updated_time 
+            SELECT ratios_data, (SELECT COUNT(*) FROM json_each(ratios_data)) AS ratio_count,
+                   cache_date, updated_time 
             FROM ratios_cache 
             WHERE holding_id = ?
         """, (holding_id,))
@@ -405,7 +692,8 @@ def get_ratios_cache(holding_id: str) -> Optional[Dict[str, Any]]:
             return None
         
         return {
-            'data': json.loads(result['ratios_data']),
+            'data_json': result['ratios_data'],
+            'count': result['ratio_count'],
             'date': result['cache_date'],
             'updated_time': result['updated_time']
         }
@@ -423,15 +711,15 @@ def save_quarterly_cache(holding_id: str, quarterly_data: Dict[str, Any], cache_
         """, (
             user_id,
             holding_id,
-            json.dumps(quarterly_data),
+            orjson.dumps(quarterly_data, option=orjson.OPT_NON_STR_KEYS).decode('utf-8'),
             cache_date,
             updated_time
         ))
 
 
 def get_quarterly_cache(holding_id: str) -> Optional[Dict[str, Any]]:
-    """Get cached quarterly data for holding"""
-    with get_db() as conn:
+    """Get cached quarterly data for holding as the stored JSON text (not decoded)"""
+    with read_conn() as conn:
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -445,55 +733,131 @@ def get_quarterly_cache(holding_id: str) -> Optional[Dict[str, Any]]:
             return None
         
         return {
-            'data': json.loads(result['quarterly_data']),
+            'data_json': result['quarterly_data'],
             'date': result['cache_date'],
             'updated_time': result['updated_time']
         }
 
 
 def get_companies_for_suggestions(query: str) -> List[Dict[str, Any]]:
-    """Get companies matching search query for suggestions"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT name, tickers FROM companies 
-            WHERE name LIKE ? OR tickers LIKE ?
-            ORDER BY name
+    """Get companies matching search query for suggestions (ticker-prefix matches first)"""
+    _, by_name, suggestions = _get_company_index()
+    
+    prefix_pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    with read_conn() as conn:
+        # NOCASE primary key turns the prefix LIKE into an index range scan
+        company_ids = [row[0] for row in conn.execute("""
+            SELECT company_id FROM company_tickers
+            WHERE ticker LIKE ? ESCAPE '\\'
+            ORDER BY ticker
             LIMIT 10
-        """, (f'%{query}%', f'%{query}%'))
-        
-        companies = []
-        for row in cursor.fetchall():
-            tickers = json.loads(row['tickers'])
-            primary_ticker = min(tickers, key=len)
-            
-            companies.append({
-                'ticker': primary_ticker,
-                'company_name': row['name'],
-                'display_ticker': primary_ticker + (f" ({', '.join([t for t in tickers if t != primary_ticker])})" if len(tickers) > 1 else ""),
-                'all_tickers': tickers
-            })
-        
-        return companies
+        """, (prefix_pattern,))]
+        
+        if len(query) >= 3:
+            # Trigram index handles substring matches; quote the query as a phrase
+            company_ids += [row[0] for row in conn.execute("""
+                SELECT rowid FROM companies_fts
+                WHERE companies_fts MATCH ?
+                ORDER BY rank
+                LIMIT 10
+            """, ('"' + query.replace('"', '""') + '"',))]
+    
+    if len(query) < 3:
+        # Too short for trigrams; scan the in-memory company list instead of the table
+        query = query.lower()
+        company_ids += islice((
+            company_id for search_text, company_id in by_name
+            if query in search_text
+        ), 10)
+    
+    results = []
+    for company_id in dict.fromkeys(company_ids):
+        suggestion = suggestions.get(company_id)
+        if suggestion:
+            results.append(suggestion)
+            if len(results) == 10:
+                break
+    
+    return results
+
+
+def _invalidate_company_index():
+    """Drop the in-memory ticker map so the next lookup rebuilds it"""
+    global _company_index, _company_index_version
+    
+    with _company_index_lock:
+        _company_index = None
+        _company_index_version += 1
+
+
+def _build_suggestion(company: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the search suggestion entry for a company"""
+    tickers = company['tickers']
+    primary_ticker = min(tickers, key=len)
+    
+    return {
+        'ticker': primary_ticker,
+        'company_name': company['name'],
+        'display_ticker': primary_ticker + (f" ({', '.join([t for t in tickers if t != primary_ticker])})" if len(tickers) > 1 else ""),
+        'all_tickers': tickers
+    }
+
+
+def _get_company_index() -> Tuple[Dict[str, Dict[str, Any]], List[Tuple[str, int]], Dict[int, Dict[str, Any]]]:
+    """Return (ticker -> company, name-ordered search list, id -> suggestion), building them if needed"""
+    global _company_index
+    
+    with _company_index_lock:
+        if _company_index is not None:
+            return _company_index
+        version = _company_index_version
+    
+    with read_conn() as conn:
+        # Aggregate every company into one JSON document so the tickers and
+        # screener URLs are decoded by a single orjson call, not one per row
+        companies_json = conn.execute("""
+            SELECT json_group_array(json_array(
+                id, name, json(tickers), json(screener_urls), kotak_url, created_at
+            ))
+            FROM (SELECT * FROM companies ORDER BY name)
+        """).fetchone()[0]
+        ticker_rows = conn.execute("SELECT ticker, company_id FROM company_tickers").fetchall()
+    
+    companies = {
+        company[0]: dict(zip(COMPANY_KEYS, company))
+        for company in orjson.loads(companies_json)
+    }
+    by_ticker = {ticker: companies[company_id] for ticker, company_id in ticker_rows}
+    
+    # Suggestion entries are precomputed so keystrokes only filter and slice
+    suggestions = {company_id: _build_suggestion(company) for company_id, company in companies.items()}
+    
+    # Lower-cased name and tickers, one per line, for substring search
+    by_name = [
+        ('\n'.join([company['name'], *company['tickers']]).lower(), company_id)
+        for company_id, company in companies.items()
+    ]
+    
+    index = (by_ticker, by_name, suggestions)
+    with _company_index_lock:
+        # Only publish if no company changed while we were reading
+        if _company_index_version == version:
+            _company_index = index
+    return index
 
 
 def find_company_by_ticker(ticker: str) -> Optional[Dict[str, Any]]:
     """Find company by any of its tickers"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM companies")
-        
-        for row in cursor.fetchall():
-            tickers = json.loads(row['tickers'])
-            if ticker.upper() in [t.upper() for t in tickers]:
-                company = dict(row)
-                company['tickers'] = tickers
-                company['screener_urls'] = json.loads(row['screener_urls'])
-                return company
-        
+    company = _get_company_index()[0].get(ticker.upper())
+    if company is None:
         return None
+    
+    # Callers may modify the result, so hand out a copy
+    return {
+        **company,
+        'tickers': list(company['tickers']),
+        'screener_urls': dict(company['screener_urls'])
+    }
 
 
 def update_holding_avg_price_and_quantity(holding_id: str, new_quantity: int, new_avg_price: float):
@@ -503,20 +867,24 @@ def update_holding_avg_price_and_quantity(holding_id: str, new_quantity: int, ne
         
         cursor.execute("""
             UPDATE holdings 
-            SET quantity = ?, avgPrice = ?, price = ?, updated_at = CURRENT_TIMESTAMP
+            SET quantity = ?, avgPrice = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        """, (new_quantity, new_avg_price, f"₹{new_avg_price:.2f}", holding_id))
+        """, (new_quantity, new_avg_price, holding_id))
 
 
 def find_existing_holding_by_ticker(ticker: str, user_id: int) -> Optional[Dict[str, Any]]:
     """Find existing holding by ticker for specific user"""
-    with get_db() as conn:
+    with read_conn() as conn:
         cursor = conn.cursor()
         
+        # Two seeks, one per composite index; an OR here makes SQLite fall
+        # back to scanning every holding of the user
         cursor.execute("""
-            SELECT * FROM holdings 
-            WHERE (ticker = ? OR symbol = ?) AND user_id = ?
-        """, (ticker.lower(), ticker.upper(), user_id))
+            SELECT * FROM holdings WHERE user_id = ? AND ticker = ?
+            UNION ALL
+            SELECT * FROM holdings WHERE user_id = ? AND symbol = ?
+            LIMIT 1
+        """, (user_id, ticker.lower(), user_id, ticker.upper()))
         
         result = cursor.fetchone()
         if result:
@@ -543,33 +911,24 @@ def create_user(username: str, email: str, password_hash: str, first_name: str =
 
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """Get user by username"""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    with read_conn() as conn:
+        result = conn.execute(SQL_USER_BY_USERNAME, (username,)).fetchone()
         
-        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        
-        return dict(result) if result else None
+        return dict(zip(USER_COLUMNS, result)) if result else None
 
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user by email"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
-        result = cursor.fetchone()
+    with read_conn() as conn:
+        result = conn.execute(SQL_USER_BY_EMAIL, (email,)).fetchone()
         
-        return dict(result) if result else None
+        return dict(zip(USER_COLUMNS, result)) if result else None
 
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user by ID"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        result = cursor.fetchone()
+    with read_conn() as conn:
+        result = conn.execute(SQL_USER_BY_ID, (user_id,)).fetchone()
         
-        return dict(result) if result else None
+        return dict(zip(USER_PROFILE_COLUMNS, result)) if result else None
 
 
 
@@ -0,0 +1,77 @@
+"""
+Kotak Securities Page Parser
+Extracts price data from a Kotak stock page. Kept free of Flask and
+network code so it can be compiled with mypyc (`mypyc kotak_parser.py`);
+the compiled extension is picked up automatically when present.
+"""
+
+import re
+from typing import Dict, Optional, Union
+
+from selectolax.lexbor import LexborHTMLParser
+
+
+PRICE_CLEAN_RE = re.compile(r'[^\d.]')
+AMOUNT_RE = re.compile(r'^([+-]?[\d.]+)')
+PERCENT_RE = re.compile(r'\(([+-]?[\d.]+%)\)')
+
+PRICE_CONTAINER_SELECTOR = 'div[class*="TitleGridAndImage_title-grid-and-image-price"]'
+PRICE_TEXT_SELECTOR = 'div[class*="TitleGridAndImage_title-grid-and-image-price-text"][class*="kotak-heading-2"]'
+PRICE_CHANGE_SELECTOR = 'div[class*="kotak-text-regular"][class*="TitleGridAndImage_title-grid-and-image-price-subtext"]'
+PREV_CLOSE_SELECTOR = (
+    'tr[class*="StockDetail_stock-detail-performance-table-data-row"]'
+    ':has(td[class*="StockDetail_stock-detail-performance-table-label"]:lexbor-contains("Prev. Close"))'
+    ' td[class*="StockDetail_stock-detail-performance-table-value"]'
+)
+
+
+def parse_kotak_page(html: Union[str, bytes]) -> Dict[str, Optional[str]]:
+    """Extract price, previous close and price change from a Kotak stock page"""
+    tree = LexborHTMLParser(html)
+
+    current_price: Optional[str] = None
+    price_change_full: Optional[str] = None
+
+    price_container = tree.css_first(PRICE_CONTAINER_SELECTOR)
+    if price_container:
+        price_div = price_container.css_first(PRICE_TEXT_SELECTOR)
+        if price_div:
+            current_price = price_div.text().strip()
+
+        change_div = price_container.css_first(PRICE_CHANGE_SELECTOR)
+        if change_div:
+            price_change_full = change_div.text().strip()
+
+    # Extract previous close
+    previous_close: Optional[str] = None
+    value_cell = tree.css_first(PREV_CLOSE_SELECTOR)
+    if value_cell:
+        # Clean the previous close value to extract just the number
+        prev_close_cleaned = PRICE_CLEAN_RE.sub('', value_cell.text().strip())
+        previous_close = prev_close_cleaned if prev_close_cleaned else "0"
+
+    # Parse price change components
+    price_change_amount: Optional[str] = None
+    price_change_percent: Optional[str] = None
+
+    if price_change_full:
+        amount_match = AMOUNT_RE.search(price_change_full)
+        if amount_match:
+            price_change_amount = amount_match.group(1)
+
+        percent_match = PERCENT_RE.search(price_change_full)
+        if percent_match:
+            price_change_percent = percent_match.group(1)
+
+    return {
+        'price': current_price,
+        'previous_close': previous_close,
+        'price_change_amount': price_change_amount,
+        'price_change_percent': price_change_percent
+    }
+
+
+def parse_kotak_price_text(html: Union[str, bytes]) -> Optional[str]:
+    """Extract just the current price text from a Kotak stock page"""
+    price_div = LexborHTMLParser(html).css_first(PRICE_TEXT_SELECTOR)
+    return price_div.text().strip() if price_div else None
@@ -1,175 +1,537 @@
 """
 Screener.in Web Scraper Module
-Handles all Selenium-based data scraping from Screener.in
+Handles all data scraping from Screener.in, over a logged-in HTTP session
+or (optionally) a Selenium-driven Edge browser
 """
 
+import atexit
+import logging
 import os
 import re
+import shutil
+import tempfile
 import time
-import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from multiprocessing.util import Finalize
 from threading import Lock
-from bs4 import BeautifulSoup
+import requests
+from selectolax.lexbor import LexborHTMLParser
 
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.edge.service import Service as EdgeService
 
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    # Keep the console output the module always had; per-item lines are DEBUG only
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+logger.setLevel(logging.INFO)
+
 # Configuration
-import os
 SCREENER_USERNAME = os.environ.get('SCREENER_USERNAME', 'your_username')
 SCREENER_PASSWORD = os.environ.get('SCREENER_PASSWORD', 'your_password')
 EDGE_DRIVER_PATH = os.environ.get('EDGE_DRIVER_PATH', r'D:\StockDash\msedgedriver.exe')
 
+SCREENER_LOGIN_URL = 'https://www.screener.in/login/'
+SCREENER_COMPANY_URL = 'https://www.screener.in/company/{ticker}/consolidated/'
+SCREENER_REQUEST_TIMEOUT = 15
+# Present on Screener pages only for a logged-in user
+SCREENER_LOGOUT_SELECTOR = 'a[href*="/logout/"], form[action*="/logout/"]'
+# Screener pages are server-rendered, so plain HTTP is enough; set to 1 to drive Edge instead
+SCREENER_USE_SELENIUM = os.environ.get('SCREENER_USE_SELENIUM', '0') == '1'
+
+# Page sections we parse, with the element that shows each has rendered in the browser
+COMPANY_PAGE_SECTIONS = {
+    'top-ratios': '#top-ratios li span.number',
+    'quarters': '#quarters table.data-table tbody tr'
+}
+SECTIONS_OUTER_HTML_JS = (
+    "return arguments[0].map(id => document.getElementById(id))"
+    ".filter(el => el).map(el => el.outerHTML).join('');"
+)
+
+# Ratios and quarterly results come from one page load, kept briefly so the
+# second of the two scrape calls for a ticker reuses it
+COMPANY_PAGE_TTL_SECONDS = 60
+
+# Precompiled patterns for the ratio unit and quarterly metric name cleanup
+UNIT_CLEAN_RE = re.compile(r'[₹\s/]+')
+PLUS_TAIL_RE = re.compile(r'\s*\+\s*$')
+
+# Persistent Edge profile, so the disk cache survives across scrapes and runs
+EDGE_PROFILE_DIR = os.environ.get('EDGE_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'stockdash_edge'))
+EDGE_DISK_CACHE_BYTES = 64 * 1024 * 1024
+
+# Only the HTML is parsed, so skip fetching images, stylesheets and fonts
+EDGE_CONTENT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.stylesheets": 2,
+    "profile.managed_default_content_settings.fonts": 2
+}
+
+# Parallel scraping: one session per worker process, started a little apart
+SCREENER_SCRAPE_PROCESSES = int(os.environ.get('SCREENER_SCRAPE_PROCESSES', '8'))
+SCRAPE_WORKER_STAGGER_SECONDS = 0.1
+
 
 # Thread synchronization
 selenium_lock = Lock()
 
-def scrape_screener_ratios(ticker):
-    """
-    Scrape fresh financial ratios from Screener.in using Selenium
+# One logged-in HTTP session shared by every scrape, created on first use
+_http_session = None
+_http_session_lock = Lock()
+
+# One logged-in browser shared by every scrape, started on first use
+_driver = None
+_driver_lock = Lock()
+# Edge locks its profile, so each scrape worker process gets its own directory
+_edge_profile_dir = EDGE_PROFILE_DIR
+
+# Ticker -> (expires_at, (ratios, quarterly_data)) for recently scraped pages
+_company_pages = {}
+# Ticker -> Future for page loads in progress, so concurrent callers share one load
+_company_page_loads = {}
+_company_pages_lock = Lock()
+
+
+def _http_login(session):
+    """Log a requests session into Screener.in, returning True on success"""
+    logger.info(f"🔐 [SCRAPER] Logging into Screener.in...")
+    response = session.get(SCREENER_LOGIN_URL, timeout=SCREENER_REQUEST_TIMEOUT)
+    response.raise_for_status()
     
-    Args:
-        ticker (str): Stock ticker symbol (e.g., 'AXISBANK')
-        
-    Returns:
-        dict: Financial ratios data or None if failed
-    """
-    print(f"🔄 [SCRAPER] Starting scrape for {ticker}")
+    # Django's login form needs its CSRF token echoed back
+    csrf_input = LexborHTMLParser(response.content).css_first('input[name="csrfmiddlewaretoken"]')
+    csrf_token = csrf_input.attributes.get('value') if csrf_input else session.cookies.get('csrftoken')
     
-    with selenium_lock:
-        options = webdriver.EdgeOptions()
-        options.add_argument('--headless')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--guest')
-        options.add_argument('--no-first-run')
+    response = session.post(
+        SCREENER_LOGIN_URL,
+        data={
+            'username': SCREENER_USERNAME,
+            'password': SCREENER_PASSWORD,
+            'csrfmiddlewaretoken': csrf_token
+        },
+        headers={'Referer': SCREENER_LOGIN_URL},
+        timeout=SCREENER_REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    
+    # A good login redirects away from the login page
+    if '/login/' in response.url:
+        logger.warning(f"❌ [SCRAPER] Login failed")
+        return False
+    
+    logger.info(f"✅ [SCRAPER] Login successful")
+    return True
+
+
+def _get_http_session():
+    """Return the shared logged-in HTTP session, creating it if needed (None on failure)"""
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is not None:
+            return _http_session
         
-        if not os.path.exists(EDGE_DRIVER_PATH):
-            print(f"❌ [SCRAPER] EdgeDriver not found at {EDGE_DRIVER_PATH}")
+        session = requests.Session()
+        session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        if not _http_login(session):
+            session.close()
             return None
         
-        driver = None
+        _http_session = session
+        return _http_session
+
+
+def _reset_http_session():
+    """Drop the shared HTTP session so the next scrape logs in again"""
+    global _http_session
+    
+    with _http_session_lock:
+        session, _http_session = _http_session, None
+    
+    if session:
+        session.close()
+
+
+def _fetch_company_page(ticker):
+    """Fetch a ticker's company page over the logged-in HTTP session"""
+    session = _get_http_session()
+    if session is None:
+        return None
+    
+    logger.info(f"📊 [SCRAPER] Fetching {ticker} page...")
+    response = session.get(SCREENER_COMPANY_URL.format(ticker=ticker), timeout=SCREENER_REQUEST_TIMEOUT)
+    response.raise_for_status()
+    
+    if '/login/' in response.url:
+        # Session expired; log in afresh next time
+        logger.warning(f"❌ [SCRAPER] Session expired while fetching {ticker}")
+        _reset_http_session()
+        return None
+    
+    return response.content
+
+
+def _load_company_page_in_browser(ticker):
+    """Load a ticker's company page in the shared browser and return the parsed sections' HTML"""
+    driver = _get_driver()
+    if driver is None:
+        return None
+    
+    with selenium_lock:
         try:
-            # Initialize webdriver
-            service = EdgeService(EDGE_DRIVER_PATH)
-            driver = webdriver.Edge(service=service, options=options)
             wait = WebDriverWait(driver, 15)
             
-            # Login to Screener.in
-            print(f"🔐 [SCRAPER] Logging into Screener.in...")
-            driver.get('https://www.screener.in/login/')
-            time.sleep(2)
-            
-            # Fill login form
-            username_input = wait.until(EC.presence_of_element_located((By.NAME, 'username')))
-            username_input.clear()
-            username_input.send_keys(SCREENER_USERNAME)
-            
-            password_input = driver.find_element(By.NAME, 'password')
-            password_input.clear()
-            password_input.send_keys(SCREENER_PASSWORD)
-            
-            # Submit login
-            login_button = driver.find_element(By.XPATH, "//button[@type='submit']")
-            login_button.click()
-            
-            # Verify login success
-            time.sleep(5)
-            if '/login/' in driver.current_url:
-                print(f"❌ [SCRAPER] Login failed for {ticker}")
-                _log_login_errors(driver)
-                return None
+            logger.info(f"📊 [SCRAPER] Navigating to {ticker} page...")
+            driver.get(SCREENER_COMPANY_URL.format(ticker=ticker))
             
-            print(f"✅ [SCRAPER] Login successful")
-            
-            # Navigate to company page
-            ticker_url = f'https://www.screener.in/company/{ticker}/consolidated/'
-            print(f"📊 [SCRAPER] Navigating to {ticker} page...")
-            driver.get(ticker_url)
-            
-            # Wait for ratios section to load
-            wait.until(EC.presence_of_element_located((By.ID, 'top-ratios')))
-            time.sleep(3)
-            
-            # Parse ratios data
-            ratios = _parse_ratios_from_page(driver, ticker)
+            for ready_selector in COMPANY_PAGE_SECTIONS.values():
+                try:
+                    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+                except TimeoutException:
+                    logger.warning(f"⚠️ [SCRAPER] {ready_selector} did not appear on {ticker} page")
             
-            if ratios:
-                print(f"✅ [SCRAPER] Successfully scraped {len(ratios)} ratios for {ticker}")
-                return ratios
-            else:
-                print(f"❌ [SCRAPER] No ratios found for {ticker}")
-                _save_debug_page(driver, ticker)
-                return None
-                
-        except Exception as e:
-            print(f"❌ [SCRAPER] Exception for {ticker}: {str(e)}")
-            print(f"❌ [SCRAPER] Traceback: {traceback.format_exc()}")
+            # Only the sections we parse cross the WebDriver connection, not the whole DOM
+            return driver.execute_script(SECTIONS_OUTER_HTML_JS, list(COMPANY_PAGE_SECTIONS))
+        except WebDriverException as e:
+            # Handled while still holding the lock, so no other thread is mid-command on this browser
+            _handle_scrape_error(e, driver)
+            raise
+
+
+def _load_company_page(ticker):
+    """Return HTML containing the parsed sections of a ticker's company page (None on failure)"""
+    if SCREENER_USE_SELENIUM:
+        return _load_company_page_in_browser(ticker)
+    return _fetch_company_page(ticker)
+
+
+def _build_edge_options(profile_dir):
+    """Edge options for the headless scraping browser"""
+    options = webdriver.EdgeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_argument(f'--user-data-dir={profile_dir}')
+    options.add_argument(f'--disk-cache-size={EDGE_DISK_CACHE_BYTES}')
+    options.add_argument('--no-first-run')
+    options.add_experimental_option('prefs', EDGE_CONTENT_PREFS)
+    # Return from driver.get at DOMContentLoaded; explicit waits cover the content we need
+    options.page_load_strategy = 'eager'
+    return options
+
+
+def _login(driver):
+    """Log into Screener.in, returning True on success"""
+    wait = WebDriverWait(driver, 15)
+    
+    logger.info(f"🔐 [SCRAPER] Logging into Screener.in...")
+    driver.get(SCREENER_LOGIN_URL)
+    
+    # The persistent profile may still hold a session from an earlier run, in
+    # which case Screener redirects away from the form or shows a logout link
+    wait.until(lambda d: (
+        '/login/' not in d.current_url
+        or d.find_elements(By.NAME, 'username')
+        or d.find_elements(By.CSS_SELECTOR, SCREENER_LOGOUT_SELECTOR)
+    ))
+    if '/login/' not in driver.current_url or driver.find_elements(By.CSS_SELECTOR, SCREENER_LOGOUT_SELECTOR):
+        logger.info(f"✅ [SCRAPER] Already logged in")
+        return True
+    
+    # Fill login form
+    username_input = driver.find_element(By.NAME, 'username')
+    username_input.clear()
+    username_input.send_keys(SCREENER_USERNAME)
+    
+    password_input = driver.find_element(By.NAME, 'password')
+    password_input.clear()
+    password_input.send_keys(SCREENER_PASSWORD)
+    
+    # Submit login
+    login_button = driver.find_element(By.XPATH, "//button[@type='submit']")
+    login_button.click()
+    
+    # Verify login success: a good login redirects away from the login page
+    try:
+        wait.until(lambda d: '/login/' not in d.current_url)
+    except TimeoutException:
+        logger.warning(f"❌ [SCRAPER] Login failed")
+        _log_login_errors(driver)
+        return False
+    
+    logger.info(f"✅ [SCRAPER] Login successful")
+    return True
+
+
+def _start_edge(profile_dir):
+    """Start a headless Edge using the given profile directory"""
+    # Keep-alive reuses one HTTP connection to msedgedriver for every command
+    return webdriver.Edge(
+        service=EdgeService(EDGE_DRIVER_PATH), options=_build_edge_options(profile_dir), keep_alive=True
+    )
+
+
+def _get_driver():
+    """Return the shared logged-in browser, starting it if needed (None on failure)"""
+    global _driver
+    
+    with _driver_lock:
+        if _driver is not None:
+            return _driver
+        
+        if not os.path.exists(EDGE_DRIVER_PATH):
+            logger.warning(f"❌ [SCRAPER] EdgeDriver not found at {EDGE_DRIVER_PATH}")
             return None
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                    print(f"🚫 [SCRAPER] Browser closed")
-                except Exception:
-                    pass
+        
+        try:
+            driver = _start_edge(_edge_profile_dir)
+        except SessionNotCreatedException as e:
+            # A crashed or still-running Edge leaves its profile locked; use a throwaway one
+            logger.warning(f"⚠️ [SCRAPER] Could not start Edge with profile {_edge_profile_dir}: {e.msg}")
+            fallback_dir = tempfile.mkdtemp(prefix='stockdash_edge_')
+            Finalize(None, shutil.rmtree, args=(fallback_dir,), kwargs={'ignore_errors': True}, exitpriority=5)
+            driver = _start_edge(fallback_dir)
+        
+        try:
+            logged_in = _login(driver)
+        except Exception:
+            driver.quit()
+            raise
+        
+        if not logged_in:
+            driver.quit()
+            return None
+        
+        _driver = driver
+        return _driver
+
+
+def _reset_driver(driver=None):
+    """Close a browser (the shared one by default) so the next scrape starts a fresh session"""
+    global _driver
+    
+    with _driver_lock:
+        if driver is None:
+            driver = _driver
+        # A late error from a browser that was already replaced must not drop its replacement
+        if _driver is driver:
+            _driver = None
+    
+    if driver:
+        try:
+            driver.quit()
+            logger.info(f"🚫 [SCRAPER] Browser closed")
+        except Exception:
+            pass
+
+
+atexit.register(_reset_driver)
+
+
+def _handle_scrape_error(e, driver):
+    """Drop the given browser when its session itself has failed"""
+    # A timeout only means the page lacked the section; the session is still usable
+    if isinstance(e, WebDriverException) and not isinstance(e, TimeoutException):
+        _reset_driver(driver)
+
+
+def _load_and_parse_company_page(ticker):
+    """Load a company page and run both extractors on a single parse of it"""
+    logger.info(f"🔄 [SCRAPER] Starting scrape for {ticker}")
+    
+    try:
+        html = _load_company_page(ticker)
+        if html is None:
+            return None, None
+        
+        # One parse shared by both extractors
+        tree = LexborHTMLParser(html)
+        result = (_parse_ratios_from_page(tree, ticker), _parse_quarterly_results(tree, ticker))
+        
+    except Exception as e:
+        logger.exception(f"❌ [SCRAPER] Exception for {ticker}: {str(e)}")
+        return None, None
+    
+    if not result[0]:
+        _save_debug_page(html, ticker)
+    return result
+
+
+def scrape_company_page(ticker):
+    """
+    Scrape ratios and quarterly results from a single load and parse of a company page
+    
+    Args:
+        ticker (str): Stock ticker symbol (e.g., 'AXISBANK')
+        
+    Returns:
+        tuple: (ratios, quarterly_data); either is None if not found
+    """
+    now = time.time()
+    with _company_pages_lock:
+        entry = _company_pages.get(ticker)
+        if entry and entry[0] > now:
+            return entry[1]
+        
+        # The ratios and quarterly routes usually ask at the same moment; the
+        # second caller waits for the first caller's load instead of starting its own
+        future = _company_page_loads.get(ticker)
+        is_owner = future is None
+        if is_owner:
+            future = _company_page_loads[ticker] = Future()
+    
+    if not is_owner:
+        return future.result()
+    
+    result = (None, None)
+    try:
+        result = _load_and_parse_company_page(ticker)
+    finally:
+        with _company_pages_lock:
+            del _company_page_loads[ticker]
+            if result[0] or result[1]:
+                now = time.time()
+                for expired in [t for t, (expires_at, _) in _company_pages.items() if expires_at <= now]:
+                    del _company_pages[expired]
+                _company_pages[ticker] = (now + COMPANY_PAGE_TTL_SECONDS, result)
+        future.set_result(result)
+    
+    return result
+
+
+def scrape_screener_ratios(ticker):
+    """
+    Scrape fresh financial ratios from Screener.in
+    
+    Args:
+        ticker (str): Stock ticker symbol (e.g., 'AXISBANK')
+        
+    Returns:
+        dict: Financial ratios data or None if failed
+    """
+    ratios = scrape_company_page(ticker)[0]
+    
+    if ratios:
+        logger.info(f"✅ [SCRAPER] Successfully scraped {len(ratios)} ratios for {ticker}")
+    else:
+        logger.warning(f"❌ [SCRAPER] No ratios found for {ticker}")
+    return ratios
+
+def _init_scrape_worker(worker_counter):
+    """Stagger a worker's start and close its sessions when the worker exits"""
+    global _edge_profile_dir
+    
+    with worker_counter.get_lock():
+        worker_id = worker_counter.value
+        worker_counter.value += 1
+    
+    # Unique per live process, so concurrent pools never share a profile
+    _edge_profile_dir = f'{EDGE_PROFILE_DIR}_{os.getpid()}'
+    
+    # Pool workers skip atexit handlers, so register with multiprocessing instead;
+    # the browser is closed before its profile directory is removed
+    Finalize(None, _reset_driver, exitpriority=10)
+    Finalize(None, _reset_http_session, exitpriority=10)
+    Finalize(None, shutil.rmtree, args=(_edge_profile_dir,), kwargs={'ignore_errors': True}, exitpriority=5)
+    time.sleep(SCRAPE_WORKER_STAGGER_SECONDS * worker_id)
+
+
+def scrape_many_ratios(tickers, max_workers=SCREENER_SCRAPE_PROCESSES):
+    """
+    Scrape financial ratios for several tickers in parallel
+    
+    Workers are spawned, so each one re-imports the launching script; that
+    script must keep its startup work (database, background threads) behind
+    its __main__ guard, as app.py does with startup().
+    
+    Args:
+        tickers (list): Stock ticker symbols
+        max_workers (int): Number of worker processes, each with its own logged-in session
+        
+    Returns:
+        dict: Ticker -> ratios data (None for tickers that failed)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+    
+    logger.info(f"🔄 [SCRAPER] Scraping {len(tickers)} tickers with up to {max_workers} workers")
+    
+    # Spawned rather than forked: a forked worker would inherit this process's
+    # browser, HTTP session sockets and page cache, and drive them concurrently
+    mp_context = get_context('spawn')
+    
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(tickers)), mp_context=mp_context,
+        initializer=_init_scrape_worker, initargs=(mp_context.Value('i', 0),)
+    ) as pool:
+        futures = {pool.submit(scrape_screener_ratios, ticker): ticker for ticker in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                logger.warning(f"❌ [SCRAPER] Worker failed for {ticker}: {str(e)}")
+                results[ticker] = None
+    
+    return results
+
 
 def _log_login_errors(driver):
     """Log login error messages for debugging"""
     try:
         error_elements = driver.find_elements(By.CLASS_NAME, 'error')
         for error in error_elements:
-            print(f"🚨 [SCRAPER] Login error: {error.text}")
+            logger.warning(f"🚨 [SCRAPER] Login error: {error.text}")
     except Exception:
         pass
 
-def _parse_ratios_from_page(driver, ticker):
-    """Parse financial ratios from the loaded page - Enhanced Version"""
+def _parse_ratios_from_page(tree, ticker):
+    """Parse financial ratios from the parsed page - Enhanced Version"""
     try:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        top_ratios = soup.find('ul', id='top-ratios')
+        top_ratios = tree.css_first('ul#top-ratios')
         
         if not top_ratios:
-            print(f"❌ [SCRAPER] Ratios section not found for {ticker}")
+            logger.warning(f"❌ [SCRAPER] Ratios section not found for {ticker}")
             return None
         
         # Get ALL ratio items (both default and quick-ratio)
-        ratio_items = top_ratios.find_all('li', class_='flex flex-space-between')
+        ratio_items = top_ratios.css('li.flex.flex-space-between')
         ratios = {}
         
-        print(f"🔍 [SCRAPER] Found {len(ratio_items)} total ratios for {ticker}")
+        logger.debug(f"🔍 [SCRAPER] Found {len(ratio_items)} total ratios for {ticker}")
         
         for item in ratio_items:
-            name_span = item.find('span', class_='name')
-            value_span = item.find('span', class_='value')
+            name_span = item.css_first('span.name')
+            value_span = item.css_first('span.value')
             
             if name_span and value_span:
-                ratio_name = name_span.get_text(strip=True)
-                full_value = value_span.get_text(strip=True)
+                ratio_name = name_span.text(strip=True)
+                full_value = value_span.text(strip=True)
                 
-                # Extract number value more robustly
-                number_spans = value_span.find_all('span', class_='number')
-                if number_spans:
-                    # Handle cases like "High / Low" with multiple numbers
-                    number_values = [span.get_text(strip=True) for span in number_spans]
-                    if len(number_values) == 1:
-                        number_value = number_values[0]
-                    else:
-                        number_value = ' / '.join(number_values)
-                else:
-                    number_value = ""
+                # Extract number values in one pass; "High / Low" style ratios have several
+                number_values = [span.text(strip=True) for span in value_span.css('span.number')]
+                number_value = ' / '.join(number_values)
                 
                 # Extract unit by removing number values from full value
                 unit = full_value
-                for num in number_values if number_spans else []:
+                for num in number_values:
                     unit = unit.replace(num, '')
-                unit = re.sub(r'[₹\s/]+', ' ', unit).strip()
+                unit = UNIT_CLEAN_RE.sub(' ', unit).strip()
                 
                 # Get data source type
-                data_source = item.get('data-source', 'unknown')
+                data_source = item.attributes.get('data-source', 'unknown')
                 
                 ratios[ratio_name] = {
                     'full_value': full_value,
@@ -178,37 +540,38 @@ def _parse_ratios_from_page(driver, ticker):
                     'source_type': data_source  # Added for debugging
                 }
                 
-                print(f"   ✓ {ratio_name}: {full_value} (source: {data_source})")
+                logger.debug("   ✓ %s: %s (source: %s)", ratio_name, full_value, data_source)
         
-        print(f"✅ [SCRAPER] Successfully parsed {len(ratios)} ratios")
+        logger.info(f"✅ [SCRAPER] Successfully parsed {len(ratios)} ratios")
         return ratios if ratios else None
         
     except Exception as e:
-        print(f"❌ [SCRAPER] Error parsing ratios: {e}")
-        print(f"❌ [SCRAPER] Traceback: {traceback.format_exc()}")
+        logger.exception(f"❌ [SCRAPER] Error parsing ratios: {e}")
         return None
 
 
-def _save_debug_page(driver, ticker):
+def _save_debug_page(html, ticker):
     """Save page source for debugging purposes"""
     try:
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', errors='replace')
         with open(f'debug_scraper_{ticker}.html', 'w', encoding='utf-8') as f:
-            f.write(driver.page_source)
-        print(f"💾 [SCRAPER] Debug page saved: debug_scraper_{ticker}.html")
+            f.write(html)
+        logger.info(f"💾 [SCRAPER] Debug page saved: debug_scraper_{ticker}.html")
     except Exception as e:
-        print(f"❌ [SCRAPER] Could not save debug page: {e}")
+        logger.warning(f"❌ [SCRAPER] Could not save debug page: {e}")
 
 def test_scraper(ticker='AXISBANK'):
     """Test function to verify scraper is working"""
-    print(f"🧪 [SCRAPER] Testing scraper with {ticker}")
+    logger.info(f"🧪 [SCRAPER] Testing scraper with {ticker}")
     result = scrape_screener_ratios(ticker)
     
     if result:
-        print(f"✅ [SCRAPER] Test successful! Found {len(result)} ratios")
+        logger.info(f"✅ [SCRAPER] Test successful! Found {len(result)} ratios")
         for name, data in list(result.items())[:3]:  # Show first 3 ratios
-            print(f"   {name}: {data['full_value']}")
+            logger.info(f"   {name}: {data['full_value']}")
     else:
-        print(f"❌ [SCRAPER] Test failed!")
+        logger.warning(f"❌ [SCRAPER] Test failed!")
     
     return result
 
@@ -224,108 +587,37 @@ def scrape_quarterly_results(ticker):
     Returns:
         dict: Quarterly results data with headers and rows
     """
-    print(f"📊 [SCRAPER] Scraping quarterly results for {ticker}")
+    logger.info(f"📊 [SCRAPER] Scraping quarterly results for {ticker}")
     
-    with selenium_lock:
-        options = webdriver.EdgeOptions()
-        options.add_argument('--headless')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        options.add_argument('--guest')
-        options.add_argument('--no-first-run')
-        
-        if not os.path.exists(EDGE_DRIVER_PATH):
-            print(f"❌ [SCRAPER] EdgeDriver not found at {EDGE_DRIVER_PATH}")
-            return None
-        
-        driver = None
-        try:
-            # Initialize webdriver
-            service = EdgeService(EDGE_DRIVER_PATH)
-            driver = webdriver.Edge(service=service, options=options)
-            wait = WebDriverWait(driver, 15)
-            
-            # Login to Screener.in
-            print(f"🔐 [SCRAPER] Logging into Screener.in...")
-            driver.get('https://www.screener.in/login/')
-            time.sleep(2)
-            
-            # Fill login form
-            username_input = wait.until(EC.presence_of_element_located((By.NAME, 'username')))
-            username_input.clear()
-            username_input.send_keys(SCREENER_USERNAME)
-            
-            password_input = driver.find_element(By.NAME, 'password')
-            password_input.clear()
-            password_input.send_keys(SCREENER_PASSWORD)
-            
-            # Submit login
-            login_button = driver.find_element(By.XPATH, "//button[@type='submit']")
-            login_button.click()
-            
-            # Verify login success
-            time.sleep(5)
-            if '/login/' in driver.current_url:
-                print(f"❌ [SCRAPER] Login failed for {ticker}")
-                _log_login_errors(driver)
-                return None
-            
-            print(f"✅ [SCRAPER] Login successful")
-            
-            # Navigate to company page
-            ticker_url = f'https://www.screener.in/company/{ticker}/consolidated/'
-            print(f"📊 [SCRAPER] Navigating to {ticker} page...")
-            driver.get(ticker_url)
-            
-            # Wait for quarterly results section
-            wait.until(EC.presence_of_element_located((By.ID, 'quarters')))
-            time.sleep(3)
-            
-            # Parse quarterly data
-            quarterly_data = _parse_quarterly_results(driver, ticker)
-            
-            if quarterly_data:
-                print(f"✅ [SCRAPER] Successfully scraped quarterly data for {ticker}")
-                return quarterly_data
-            else:
-                print(f"❌ [SCRAPER] No quarterly data found for {ticker}")
-                return None
-                
-        except Exception as e:
-            print(f"❌ [SCRAPER] Exception in quarterly scraping: {str(e)}")
-            print(f"❌ [SCRAPER] Traceback: {traceback.format_exc()}")
-            return None
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                    print(f"🚫 [SCRAPER] Browser closed")
-                except Exception:
-                    pass
+    quarterly_data = scrape_company_page(ticker)[1]
+    
+    if quarterly_data:
+        logger.info(f"✅ [SCRAPER] Successfully scraped quarterly data for {ticker}")
+    else:
+        logger.warning(f"❌ [SCRAPER] No quarterly data found for {ticker}")
+    return quarterly_data
 
 
-def _parse_quarterly_results(driver, ticker):
-    """Parse quarterly results table from the page"""
+def _parse_quarterly_results(tree, ticker):
+    """Parse quarterly results table from the parsed page"""
     try:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        quarters_section = soup.find('section', id='quarters')
+        quarters_section = tree.css_first('section#quarters')
         
         if not quarters_section:
-            print(f"❌ [SCRAPER] Quarterly section not found for {ticker}")
+            logger.warning(f"❌ [SCRAPER] Quarterly section not found for {ticker}")
             return None
         
         # Find the data table
-        table = quarters_section.find('table', class_='data-table')
+        table = quarters_section.css_first('table.data-table')
         if not table:
-            print(f"❌ [SCRAPER] Quarterly table not found for {ticker}")
+            logger.warning(f"❌ [SCRAPER] Quarterly table not found for {ticker}")
             return None
         
         # Extract headers (quarters)
         headers = []
-        header_row = table.find('thead').find('tr')
-        for th in header_row.find_all('th')[1:]:  # Skip first empty header
-            quarter = th.get_text(strip=True)
+        header_row = table.css_first('thead tr')
+        for th in header_row.css('th')[1:]:  # Skip first empty header
+            quarter = th.text(strip=True)
             if quarter:
                 headers.append(quarter)
         
@@ -335,35 +627,33 @@ def _parse_quarterly_results(driver, ticker):
             'metrics': {}
         }
         
-        tbody = table.find('tbody')
-        for row in tbody.find_all('tr'):
-            if 'font-size-14' in row.get('class', []):  # Skip PDF links row
+        for row in table.css('tbody tr'):
+            if 'font-size-14' in (row.attributes.get('class') or '').split():  # Skip PDF links row
                 continue
                 
-            cells = row.find_all('td')
+            cells = row.css('td')
             if len(cells) < 2:
                 continue
                 
             # Get metric name
-            metric_name = cells[0].get_text(strip=True)
+            metric_name = cells[0].text(strip=True)
             # Clean metric name (remove + buttons)
-            metric_name = re.sub(r'\s*\+\s*$', '', metric_name)
+            metric_name = PLUS_TAIL_RE.sub('', metric_name)
             
             # Get values for each quarter
             values = []
             for cell in cells[1:len(headers)+1]:  # Match header count
-                value = cell.get_text(strip=True)
+                value = cell.text(strip=True)
                 values.append(value)
             
             quarterly_data['metrics'][metric_name] = values
-            print(f"   ✓ {metric_name}: {len(values)} quarters")
+            logger.debug("   ✓ %s: %d quarters", metric_name, len(values))
         
-        print(f"✅ [SCRAPER] Parsed {len(quarterly_data['metrics'])} metrics across {len(headers)} quarters")
+        logger.info(f"✅ [SCRAPER] Parsed {len(quarterly_data['metrics'])} metrics across {len(headers)} quarters")
         return quarterly_data
         
     except Exception as e:
-        print(f"❌ [SCRAPER] Error parsing quarterly results: {e}")
-        print(f"❌ [SCRAPER] Traceback: {traceback.format_exc()}")
+        logger.exception(f"❌ [SCRAPER] Error parsing quarterly results: {e}")
         return None
 
 
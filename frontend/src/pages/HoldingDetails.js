@@ -8,6 +8,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useAuth } from '../auth/AuthContext';
+import { streamHoldingPrices } from '../priceStream';
 import './HoldingDetails.css';
 
 function HoldingDetails() {
@@ -44,6 +45,11 @@ function HoldingDetails() {
         setHolding(foundHolding);
         setError('');
         setBasicDataLoaded(true);  // NEW: Mark basic data as loaded immediately
+
+        // Refresh the live price without blocking the page render
+        streamHoldingPrices([foundHolding.id], getAuthHeaders(), (update) => {
+          setHolding(prev => ({ ...prev, ...update }));
+        }).catch(() => {});
       } else {
         setError('Holding not found');
       }
@@ -8,6 +8,7 @@ import React, { useState, useEffect, useMemo, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 import './Holdings.css';
 import { useAuth } from '../auth/AuthContext';
+import { streamHoldingPrices } from '../priceStream';
 
 // Configuration
 const API_BASE_URL = 'http://localhost:5000/api';
@@ -68,8 +69,14 @@ function Holdings() {
       const data = await response.json();
       
       if (response.ok) {
-        setHoldings(data.holdings || []);
+        const holdingsList = data.holdings || [];
+        setHoldings(holdingsList);
         setError('');
+
+        // Live prices stream in separately so the table renders immediately
+        streamHoldingPrices(holdingsList.map(h => h.id), getAuthHeaders(), (update) => {
+          setHoldings(prev => prev.map(h => (String(h.id) === String(update.id) ? { ...h, ...update } : h)));
+        }).catch(() => {});
       } else {
         setError(data.error || 'Failed to fetch holdings');
       }
@@ -0,0 +1,45 @@
+/**
+ * Live Price Stream
+ * Reads server-sent price events from the holdings prices endpoint and
+ * hands each holding's update to a callback as soon as it arrives
+ */
+
+const API_BASE_URL = 'http://localhost:5000/api';
+
+export const streamHoldingPrices = async (ids, headers, onPrice) => {
+  if (!ids.length) return;
+
+  const query = ids.map(encodeURIComponent).join(',');
+  const response = await fetch(`${API_BASE_URL}/holdings/prices?ids=${query}`, { headers });
+  if (!response.ok || !response.body) return;
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const event = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      const data = event
+        .split('\n')
+        .filter(line => line.startsWith('data: '))
+        .map(line => line.slice(6))
+        .join('\n');
+
+      if (data) {
+        const update = JSON.parse(data);
+        if (update.id) onPrice(update);
+      }
+
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+};